@@ -1,8 +1,11 @@
 from flask import Flask, render_template, request, redirect, url_for
-from src.utils.storage import (get_all_listings, save_listing, get_dashboard_stats, 
+from src.utils.storage import (get_all_listings, save_listings, get_dashboard_stats, 
                      set_last_update, get_last_update, cleanup_listings,
                      mark_visited, mark_removed, mark_favorite)
-from src.scrapers.scraper_selenium import fetch_with_selenium, verify_listings
+from src.scrapers.sources import fetch_all_sources, verify_missing
+from src.scrapers.driver_manager import get_driver_manager
+from src.utils.listing import format_euros, format_price_per_sqm
+import os
 import threading
 import time
 
@@ -15,6 +18,10 @@ def datetimeformat(value):
         return "Never"
     return value # We handle the actual formatting in JS as well, but this makes it safe for Jinja
 
+# Prices are stored as integer cents; display strings are derived when rendering
+app.add_template_filter(format_euros, 'euros')
+app.add_template_filter(format_price_per_sqm, 'price_per_sqm')
+
 @app.route('/')
 def index():
     listings = get_all_listings()
@@ -28,18 +35,13 @@ def index():
 
 @app.route('/refresh')
 def refresh():
-    # 1. Fetch new items from search
-    new_items = fetch_with_selenium()
-    found_ids = set()
+    # 1. Fetch new items from every enabled source (cross-site duplicates are merged)
+    new_items, found_ids, succeeded = fetch_all_sources()
     
     if new_items:
-        for item in new_items:
-            save_listing(item)
-            found_ids.add(item['id'])
+        save_listings(new_items)
             
-    # 2. Check for missing items (potentially sold/removed)
-
-    
+    # 2. Check for missing items (potentially sold/removed) with the source they came from
     all_local = get_all_listings()
     missing_items = []
     
@@ -48,16 +50,21 @@ def refresh():
             missing_items.append(item)
             
     if missing_items:
-        print(f"Found {len(missing_items)} missing items. Verifying status...")
-        verified_items = verify_listings(missing_items)
-        for item in verified_items:
-            save_listing(item)
+        verified_items = verify_missing(missing_items, succeeded)
+        save_listings(verified_items)
             
     # 3. Cleanup any items that are now out of bounds (config might have changed)
     removed_count, removed_ids = cleanup_listings()
     if removed_count > 0:
         print(f"Cleaned up {removed_count} out-of-bounds listings: {removed_ids}")
             
+    # 4. Export the columnar analytics snapshot
+    try:
+        from src.analytics.snapshot import export_snapshot
+        export_snapshot()
+    except Exception as e:
+        print(f"Snapshot export failed: {e}")
+            
     set_last_update()
     return redirect(url_for('index'))
 
@@ -81,4 +88,8 @@ def toggle_favorite(lid):
     return {'success': success}
 
 if __name__ == '__main__':
+    # Start the browsers while the dashboard boots so the first refresh does not pay for it.
+    # With the debug reloader only the serving child process warms up.
+    if os.environ.get('PREWARM_BROWSER', '1') == '1' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_driver_manager().prewarm()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+TOKENS = {'api-token': 'stub-token', 'cuid': 'stub-cuid', 'loaded': str(int(time.time()))}
+DISTRICTS = ['Herttoniemi', 'Kallio', 'Vallila', 'Lauttasaari', 'Tapiola']
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><title>Myytävät asunnot</title>
+{meta}
+</head><body><div id="app"></div></body></html>
+"""
+
+
+def make_cards(count, seed=1):
+    rng = random.Random(seed)
+    cards = []
+    for i in range(count):
+        district = DISTRICTS[i % len(DISTRICTS)]
+        size = round(rng.uniform(25, 110), 1)
+        cards.append({
+            'id': 30000000 + i,
+            'url': f"https://asunnot.oikotie.fi/myytavat-asunnot/helsinki/{30000000 + i}",
+            'price': f"{rng.randrange(150, 900) * 1000:,} €".replace(',', ' '),
+            'size': size,
+            'roomConfiguration': f"{rng.randint(1, 4)}h, k",
+            'buildingData': {'address': f"Stubikatu {i + 1}", 'district': district, 'city': 'Helsinki'},
+            'coordinates': {'latitude': 60.17 + rng.uniform(0, 0.05), 'longitude': 24.90 + rng.uniform(0, 0.15)},
+        })
+    return cards
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves a search page with token meta tags and /api/cards, which wants the tokens back.
+
+    Every `rate_limit_every`th API request is answered with 429 and a Retry-After header.
+    """
+    cards = []
+    rate_limit_every = 5
+    requests_seen = 0
+    lock = threading.Lock()
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == '/api/cards':
+            return self._cards(parse_qs(parts.query))
+        meta = '\n'.join(f'<meta name="{name}" content="{value}">' for name, value in TOKENS.items())
+        self._send(200, SEARCH_PAGE.format(meta=meta), 'text/html; charset=utf-8',
+                   {'Set-Cookie': 'user_id=stub; Path=/'})
+
+    def _cards(self, query):
+        if (self.headers.get('OTA-token') != TOKENS['api-token'] or self.headers.get('OTA-cuid') != TOKENS['cuid']
+                or self.headers.get('OTA-loaded') != TOKENS['loaded']):
+            return self._send(401, json.dumps({'error': 'missing or invalid OTA headers'}))
+        with self.lock:
+            StubHandler.requests_seen += 1
+            throttled = self.rate_limit_every and StubHandler.requests_seen % self.rate_limit_every == 0
+        if throttled:
+            return self._send(429, json.dumps({'error': 'too many requests'}), headers={'Retry-After': '1'})
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['24'])[0])
+        self._send(200, json.dumps({'found': len(self.cards), 'cards': self.cards[offset:offset + limit]}))
+
+    def log_message(self, format, *args):
+        print(f"[stub] {self.command} {self.path} -> {args[1] if len(args) > 1 else ''}")
+
+
+def main():
+    """Local stand-in for the search page and cards API, for exercising SEARCH_BACKEND=api offline.
+
+    python scripts/api_stub_server.py --port 8765
+    python src/scrapers/scraper_api.py http://127.0.0.1:8765/myytavat-asunnot?cardType=100
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cards', type=int, default=100, help="listings the search reports")
+    parser.add_argument('--rate-limit-every', type=int, default=5, help="answer every Nth API request with 429 (0 = never)")
+    args = parser.parse_args()
+
+    StubHandler.cards = make_cards(args.cards)
+    StubHandler.rate_limit_every = args.rate_limit_every
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubHandler)
+    print(f"Stub search page and cards API on http://127.0.0.1:{args.port}/myytavat-asunnot ({args.cards} cards)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+from src.scrapers.driver_manager import DriverManager, accept_cookies
+from src.utils.storage import get_all_listings
+
+def main():
+    """Loads the same stored listing pages with the full and lean browser profiles and compares bytes and load time."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--sample', type=int, default=10, help="number of stored listing pages to load per profile")
+    parser.add_argument('--profiles', nargs='+', default=['full', 'lean'])
+    args = parser.parse_args()
+
+    urls = [l['url'] for l in get_all_listings() if l.get('url')][:args.sample]
+    if not urls:
+        print("No stored listings to visit.")
+        return
+
+    results = {}
+    for profile in args.profiles:
+        manager = DriverManager(size=1, profile=profile)
+        with manager.lease(consent=False) as driver:
+            driver.get(urls[0])
+            accept_cookies(driver)
+            manager.metrics.reset()  # the consent round trip is not part of the comparison
+            for url in urls:
+                driver.get(url)
+        manager.shutdown()
+        results[profile] = manager.metrics.report(f"{profile} profile")
+
+    print(f"\n{'profile':>8} {'KB/page':>9} {'s/page':>8} {'blocked':>8}")
+    for profile, summary in results.items():
+        print(f"{profile:>8} {summary['avg_kb']:>9.0f} {summary['avg_seconds']:>8.2f} {summary['blocked']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import time
+from src.scrapers.driver_manager import get_driver_manager
+from src.scrapers.readiness import wait_for_any
+from src.scrapers.scraper_selenium import CARD_FALLBACK_SELECTORS, CARD_SELECTORS, read_cards
+from src.utils.config_parser import get_search_url_from_file
+
+def main():
+    """Reads the cards of the first configured search page with one injected script and element by element."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--repeat', type=int, default=3, help="extractions per mode")
+    args = parser.parse_args()
+
+    url, _, _ = get_search_url_from_file('config.txt')
+    if not url:
+        print("Invalid config")
+        return
+
+    with get_driver_manager().lease() as driver:
+        driver.get(url)
+        selector = wait_for_any(driver, CARD_SELECTORS, 'oikotie_cards', fallbacks=CARD_FALLBACK_SELECTORS)
+        if not selector:
+            print("No cards found on the search page.")
+            return
+
+        # Every WebDriver command goes through driver.execute, one HTTP round trip each
+        calls = [0]
+        original_execute = driver.execute
+        def counted_execute(*a, **kw):
+            calls[0] += 1
+            return original_execute(*a, **kw)
+        driver.execute = counted_execute
+
+        results = {}
+        try:
+            for mode in ('elements', 'script'):
+                calls[0] = 0
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    cards = read_cards(driver, selector, mode=mode)
+                elapsed = (time.perf_counter() - start) / args.repeat
+                results[mode] = (len(cards), calls[0] // args.repeat, elapsed, cards)
+        finally:
+            driver.execute = original_execute
+
+    print(f"\n{'mode':>9} {'cards':>6} {'calls':>6} {'time':>8}")
+    for mode, (count, round_trips, elapsed, _) in results.items():
+        print(f"{mode:>9} {count:>6} {round_trips:>6} {elapsed * 1000:>6.0f}ms")
+    if results['elements'][3] != results['script'][3]:
+        print("Note: the two modes returned different card data.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from src.utils import codec
+from src.utils.listing import Listing
+
+def make_records(count):
+    """Builds realistic listing and history documents, as the scraper and storage would."""
+    rng = random.Random(42)
+    records = []
+    for i in range(count):
+        price = rng.randrange(80, 900) * 1000
+        size = round(rng.uniform(20, 140), 1)
+        listing = Listing.from_scraped({
+            'id': str(17000000 + i),
+            'address': f"Esimerkkikatu {i % 90 + 1}, Kallio, Helsinki",
+            'url': f"https://asunnot.oikotie.fi/myytavat-asunnot/helsinki/{17000000 + i}",
+            'image': f"https://cdn.asunnot.oikotie.fi/{i}.jpg",
+            'price': f"{price:,} €".replace(',', ' '),
+            'size': f"{size} m²".replace('.', ','),
+            'rooms': f"{rng.randint(1, 5)}h+k",
+            'maintenance_fee': f"{rng.randint(150, 600)},00 €/kk",
+            'open_house': "18.01. klo 13:00" if i % 4 == 0 else "",
+            'latitude': 60.18 + rng.random() / 10,
+            'longitude': 24.93 + rng.random() / 10,
+            'timestamp': time.time(),
+        }).to_dict()
+        start = datetime(2024, 1, 1)
+        history = [{
+            'timestamp': (start + timedelta(days=30 * n)).isoformat(),
+            'price': listing['price'],
+            'price_cents': listing['price_cents'],
+            'image': listing['image'],
+            'open_house': listing['open_house'],
+            'price_per_sqm': listing['price_per_sqm'],
+            'maintenance_fee': listing['maintenance_fee'],
+        } for n in range(rng.randint(1, 6))]
+        records.append((listing, history))
+    return records
+
+def bench(name, encode, decode_listing, decode_history, records):
+    start = time.perf_counter()
+    blobs = [(encode(listing), encode(history)) for listing, history in records]
+    encode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for listing_blob, history_blob in blobs:
+        decode_listing(listing_blob)
+        decode_history(history_blob)
+    decode_s = time.perf_counter() - start
+
+    size = sum(len(a) + len(b) for a, b in blobs)
+    print(f"{name:<28} encode {encode_s * 1000:8.1f} ms   decode {decode_s * 1000:8.1f} ms   {size / 1024:8.0f} KiB")
+    return encode_s, decode_s, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the legacy indented JSON format with the storage codec.")
+    parser.add_argument('--listings', type=int, default=5000)
+    args = parser.parse_args()
+
+    records = make_records(args.listings)
+    print(f"{args.listings} listings, {sum(len(h) for _, h in records)} history points "
+          f"(orjson {'enabled' if codec.orjson else 'not installed'})")
+
+    legacy = bench("legacy json indent=2",
+                   lambda obj: json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8'),
+                   json.loads, json.loads, records)
+    current = bench("codec (validated)", codec.encode, codec.decode_listing, codec.decode_history, records)
+
+    print(f"speedup: encode {legacy[0] / current[0]:.1f}x, decode {legacy[1] / current[1]:.1f}x, "
+          f"size {current[2] / legacy[2]:.0%} of legacy")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+import glob
+import time
+from src.scrapers.detail_parser import parse_detail_page
+
+def main():
+    """Times parse_detail_page on saved HTML pages (default: debug/detail_*.html)."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('pages', nargs='*', help="saved detail pages (default debug/detail_*.html)")
+    parser.add_argument('--repeat', type=int, default=20, help="parses per page")
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(glob.glob('debug/detail_*.html'))
+    if not paths:
+        print("No saved pages to parse.")
+        return
+
+    print(f"{'page':<40} {'KB':>6} {'ms/parse':>9} fields")
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            page_html = f.read()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fields = parse_detail_page(page_html)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{path:<40} {len(page_html) / 1024:>6.0f} {elapsed * 1000:>9.1f} {', '.join(sorted(fields)) or '-'}")
+
+if __name__ == "__main__":
+    main()
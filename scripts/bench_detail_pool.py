@@ -0,0 +1,30 @@
+import argparse
+import copy
+from src.scrapers.scraper_selenium import enrich_in_pool
+from src.utils.storage import get_all_listings
+
+def main():
+    """Times detail page enrichment of stored listings with 1, 2 and 4 browser workers (nothing is saved)."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--sample', type=int, default=12, help="number of stored listings to visit per run")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--rate', type=float, default=None, help="page loads per second (default DETAIL_RATE_LIMIT)")
+    args = parser.parse_args()
+
+    sample = [l for l in get_all_listings() if l.get('url')][:args.sample]
+    if not sample:
+        print("No stored listings to visit.")
+        return
+
+    results = []
+    for workers in args.workers:
+        _, summary = enrich_in_pool(copy.deepcopy(sample), workers=workers, rate=args.rate)
+        results.append(summary)
+
+    baseline = results[0]['elapsed']
+    print(f"\n{'workers':>8} {'elapsed':>9} {'speedup':>8}")
+    for summary in results:
+        print(f"{summary['workers']:>8} {summary['elapsed']:>8.1f}s {baseline / summary['elapsed']:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
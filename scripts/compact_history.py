@@ -0,0 +1,16 @@
+import argparse
+from src.utils.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+from src.utils.storage import compact_history
+
+def main():
+    """Moves sold/removed listings idle for longer than the retention age into the cold archive."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"archive listings idle for more than this many days (default {ARCHIVE_AFTER_DAYS})")
+    args = parser.parse_args()
+
+    archived = compact_history(max_age_days=args.days)
+    print(f"Archived {archived} sold/removed listings older than {args.days} days into {ARCHIVE_DIR}")
+
+if __name__ == "__main__":
+    main()
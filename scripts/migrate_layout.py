@@ -0,0 +1,57 @@
+import argparse
+import os
+from src.utils.storage import DATA_DIR
+from src.utils.storage_json import JsonFileEngine, ShardedJsonEngine
+
+def _move(src, dst):
+    if src != dst and os.path.exists(src):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.replace(src, dst)
+
+def _stored_ids(directory, suffix):
+    """IDs of every document under `directory`, in the flat layout or any shard."""
+    ids = set()
+    for root, _, files in os.walk(directory):
+        ids.update(f[:-len(suffix)] for f in files if f.endswith(suffix))
+    return ids
+
+def migrate(to):
+    """Moves listing and history documents between the flat and sharded layouts."""
+    flat = JsonFileEngine(DATA_DIR)
+    sharded = ShardedJsonEngine(DATA_DIR)
+    source, target = (flat, sharded) if to == 'sharded' else (sharded, flat)
+
+    listing_ids = _stored_ids(flat.listings_dir, '.json')
+    history_ids = _stored_ids(flat.history_dir, '_history.json')
+    for lid in listing_ids:
+        # A document may already sit in the target layout after an interrupted run
+        for engine in (source, target):
+            _move(engine._listing_path(lid), target._listing_path(lid))
+    for lid in history_ids:
+        for engine in (source, target):
+            _move(engine._history_path(lid), target._history_path(lid))
+
+    if to == 'sharded':
+        sharded._update_manifest(written=listing_ids)
+        print(f"Moved {len(listing_ids)} listings and {len(history_ids)} histories into shards; "
+              f"set STORAGE_LAYOUT=sharded to use them.")
+    else:
+        for path in (sharded.manifest_path, sharded.manifest_path + '.lock'):
+            if os.path.exists(path):
+                os.remove(path)
+        for directory in (flat.listings_dir, flat.history_dir):
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if os.path.isdir(path) and not os.listdir(path):
+                    os.rmdir(path)
+        print(f"Moved {len(listing_ids)} listings and {len(history_ids)} histories back to the flat layout; "
+              f"unset STORAGE_LAYOUT to use them.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Moves the JSON data tree between the flat and sharded layouts.")
+    parser.add_argument('--to', choices=['sharded', 'flat'], default='sharded')
+    args = parser.parse_args()
+    if not os.path.isdir(DATA_DIR):
+        print(f"No data directory found at {DATA_DIR}")
+    else:
+        migrate(args.to)
@@ -0,0 +1,29 @@
+import os
+from src.utils.storage import DATA_DIR, DB_PATH, STORAGE_LAYOUT
+from src.utils.storage_json import JsonFileEngine, ShardedJsonEngine
+from src.utils.storage_sqlite import SqliteEngine
+
+def migrate():
+    """Imports the JSON listing/history tree and price change log into the SQLite database."""
+    source = ShardedJsonEngine(DATA_DIR) if STORAGE_LAYOUT == 'sharded' else JsonFileEngine(DATA_DIR)
+    target = SqliteEngine(DB_PATH)
+
+    imported = 0
+    history_points = 0
+    for listing in source.iter_listings():
+        history = source.load_history(listing['id'])
+        target.import_listing(listing, history)
+        imported += 1
+        history_points += len(history)
+
+    changes = target.import_changes(source.iter_changes())
+
+    print(f"Imported {imported} listings, {history_points} history points "
+          f"and {changes} price changes into {DB_PATH}")
+    print("Set STORAGE_BACKEND=sqlite to use the database.")
+
+if __name__ == "__main__":
+    if not os.path.isdir(DATA_DIR):
+        print(f"No data directory found at {DATA_DIR}")
+    else:
+        migrate()
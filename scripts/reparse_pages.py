@@ -0,0 +1,67 @@
+import argparse
+import time
+from src.scrapers.detail_parser import apply_details, has_details, parse_detail_page
+from src.scrapers.scraper_http import parse_search_page
+from src.utils.page_archive import PAGES_DIR, archive_stats, latest_pages, load_page
+from src.utils.storage import get_all_listings, save_listings
+
+def reparse_details(dry_run=False):
+    """Re-runs the detail extractor over the latest archived page of every stored listing."""
+    listings = {str(l['id']): l for l in get_all_listings(include_removed=True)}
+    pages = latest_pages('detail')
+    changed = []
+    parsed = skipped = 0
+    start = time.perf_counter()
+    for lid, entry in pages.items():
+        listing = listings.get(lid)
+        if listing is None:
+            continue
+        try:
+            fields = parse_detail_page(load_page(entry['sha256']))
+        except (OSError, ValueError) as e:
+            print(f"Error reparsing {lid}: {e}")
+            continue
+        parsed += 1
+        if not has_details(fields):
+            skipped += 1
+            continue
+        updated = apply_details(dict(listing), fields)
+        if updated != listing:
+            changed.append(updated)
+    elapsed = time.perf_counter() - start
+
+    print(f"Reparsed {parsed} detail pages in {elapsed:.1f}s ({parsed / elapsed if elapsed else 0:.0f} pages/s), "
+          f"{skipped} without detail fields, {len(changed)} listings changed.")
+    if changed and not dry_run:
+        save_listings(changed)
+    return changed
+
+def reparse_search():
+    """Checks that the current search parser still finds cards in the archived search pages."""
+    pages = latest_pages('search')
+    with_cards = 0
+    for url, entry in pages.items():
+        listings, total = parse_search_page(load_page(entry['sha256']))
+        if listings is not None:
+            with_cards += 1
+        print(f"{url}: {'no card data' if listings is None else f'{len(listings)} cards'}, {total or '?'} hits")
+    print(f"{with_cards}/{len(pages)} archived search pages carry card data.")
+
+def main():
+    """Re-extracts listing fields from archived pages without any network access."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--dry-run', action='store_true', help="report changes without saving them")
+    parser.add_argument('--search', action='store_true', help="also run the search page parser over archived search pages")
+    args = parser.parse_args()
+
+    stats = archive_stats()
+    print(f"{PAGES_DIR}: {stats['fetches']} fetches, {stats['blobs']} distinct pages, "
+          f"{stats['bytes'] / (1024 * 1024):.1f} MB compressed")
+    changed = reparse_details(dry_run=args.dry_run)
+    for listing in changed[:20]:
+        print(f"  {listing['id']}: toilets={listing.get('toilets')} fee={listing.get('maintenance_fee')}")
+    if args.search:
+        reparse_search()
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,9 @@ python3 src/scrapers/scraper_selenium.py
 # Optional: Generate analytics after scraping
 python3 src/analytics/generate_analytics.py
 
+# Move old sold/removed listings into the compressed archive
+python3 scripts/compact_history.py
+
 # Send Telegram summary
 python3 src/utils/telegram_notifier.py
 
@@ -1,6 +1,7 @@
+import itertools
 import json
-import os
-from src.utils.storage import LISTINGS_DIR, HISTORY_DIR, CHANGES_LOG_PATH, set_last_update
+from src.utils.storage import get_all_listings, get_history, iter_archived_listings, count_price_changes, set_last_update
+from src.utils.listing import price_cents_of
 
 def generate_price_analytics():
     """Generates a summary of price analytics across all listings."""
@@ -17,37 +18,21 @@ def generate_price_analytics():
         'most_volatile': []
     }
     
-    if not os.path.exists(LISTINGS_DIR):
-        return analytics
-    
     # Analyze all listings
     all_drops = []
     all_increases = []
     volatility_map = {}  # id -> number of changes
     
-    for filename in os.listdir(LISTINGS_DIR):
-        if not filename.endswith('.json'):
-            continue
-            
+    hot = ((listing, get_history(listing['id'])) for listing in get_all_listings(include_removed=True))
+    for listing, history in itertools.chain(hot, iter_archived_listings()):
         analytics['total_listings'] += 1
-        listing_id = filename.replace('.json', '')
-        
-        # Load listing
-        with open(os.path.join(LISTINGS_DIR, filename), 'r') as f:
-            listing = json.load(f)
+        listing_id = listing['id']
         
         # Check for price drop flag
         if listing.get('price_drop'):
             analytics['listings_with_price_drops'] += 1
         
-        # Load history to analyze changes
-        history_path = os.path.join(HISTORY_DIR, f"{listing_id}_history.json")
-        if not os.path.exists(history_path):
-            continue
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
+        # Analyze changes in the listing's history (hot or archived)
         if len(history) < 2:
             continue
         
@@ -64,20 +49,12 @@ def generate_price_analytics():
         }
         
         # Compare first and current price
-        def parse_price(price_str):
-            if not price_str or price_str == "N/A":
-                return 0.0
-            try:
-                return float(price_str.replace('€', '').replace(' ', '').replace(',', '.').strip())
-            except:
-                return 0.0
-        
-        first_price = parse_price(history[0]['price'])
-        current_price = parse_price(history[-1]['price'])
+        first_price = price_cents_of(history[0]) or 0
+        current_price = price_cents_of(history[-1]) or 0
         
         if first_price > 0 and current_price > 0:
-            diff = current_price - first_price
-            diff_pct = (diff / first_price) * 100
+            diff = (current_price - first_price) / 100
+            diff_pct = ((current_price - first_price) / first_price) * 100
             
             entry = {
                 'id': listing_id,
@@ -96,10 +73,7 @@ def generate_price_analytics():
                 analytics['listings_with_price_increases'] += 1
     
     # Load price changes log
-    if os.path.exists(CHANGES_LOG_PATH):
-        with open(CHANGES_LOG_PATH, 'r') as f:
-            changes = json.load(f)
-            analytics['total_price_changes'] = len(changes)
+    analytics['total_price_changes'] = count_price_changes()
     
     # Calculate averages
     if all_drops:
@@ -0,0 +1,120 @@
+import itertools
+import os
+import shutil
+import time
+import pandas as pd
+from src.utils.storage import DATA_DIR, get_all_listings, get_history, iter_archived_listings
+from src.utils.listing import parse_cents, price_cents_of
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshot')
+LISTINGS_SNAPSHOT = os.path.join(SNAPSHOT_DIR, 'listings.parquet')
+HISTORY_SNAPSHOT = os.path.join(SNAPSHOT_DIR, 'history')  # partitioned by month=YYYY-MM
+
+LISTING_COLUMNS = {
+    'id': 'string',
+    'address': 'string',
+    'url': 'string',
+    'price_cents': 'Int64',
+    'size_m2': 'Float64',
+    'room_count': 'Int64',
+    'price_per_sqm_cents': 'Int64',
+    'maintenance_fee_cents': 'Int64',
+    'latitude': 'Float64',
+    'longitude': 'Float64',
+    'sold': 'boolean',
+    'removed': 'boolean',
+    'visited': 'boolean',
+    'favorite': 'boolean',
+    'price_drop': 'boolean',
+    'archived': 'boolean',
+}
+
+HISTORY_COLUMNS = {
+    'listing_id': 'string',
+    'seq': 'Int64',
+    'price_cents': 'Int64',
+    'price_per_sqm_cents': 'Int64',
+    'maintenance_fee_cents': 'Int64',
+    'open_house': 'string',
+    'size_m2': 'Float64',
+    'room_count': 'Int64',
+}
+
+
+def build_frames():
+    """Returns (listings, history) DataFrames with one row per listing and per history point."""
+    listing_rows = []
+    history_rows = []
+    hot = ((listing, get_history(listing['id']), False) for listing in get_all_listings(include_removed=True))
+    archived = ((listing, history, True) for listing, history in iter_archived_listings())
+    for listing, listing_history, is_archived in itertools.chain(hot, archived):
+        listing_rows.append({column: listing.get(column) for column in LISTING_COLUMNS})
+        listing_rows[-1]['archived'] = is_archived
+        listing_rows[-1]['first_seen'] = None
+        for seq, entry in enumerate(listing_history):
+            if seq == 0:
+                listing_rows[-1]['first_seen'] = entry.get('timestamp')
+            history_rows.append({
+                'listing_id': str(listing['id']),
+                'seq': seq,
+                'timestamp': entry.get('timestamp'),
+                'price_cents': price_cents_of(entry),
+                'price_per_sqm_cents': parse_cents(entry.get('price_per_sqm')),
+                'maintenance_fee_cents': parse_cents(entry.get('maintenance_fee')),
+                'open_house': entry.get('open_house') or '',
+                'size_m2': listing.get('size_m2'),
+                'room_count': listing.get('room_count'),
+            })
+
+    listings = pd.DataFrame(listing_rows, columns=list(LISTING_COLUMNS) + ['first_seen'])
+    listings = listings.astype(LISTING_COLUMNS)
+    listings['first_seen'] = pd.to_datetime(listings['first_seen'], errors='coerce')
+
+    history = pd.DataFrame(history_rows, columns=list(HISTORY_COLUMNS) + ['timestamp'])
+    history = history.astype(HISTORY_COLUMNS)
+    history['timestamp'] = pd.to_datetime(history['timestamp'], errors='coerce')
+    history['month'] = history['timestamp'].dt.strftime('%Y-%m').fillna('unknown')
+    return listings, history
+
+
+def export_snapshot():
+    """Writes the columnar snapshot of all listings and history points. Returns the row counts."""
+    start = time.time()
+    listings, history = build_frames()
+
+    # Write next to the live snapshot and swap, so readers never see a half-written one
+    tmp_dir = SNAPSHOT_DIR + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    listings.to_parquet(os.path.join(tmp_dir, 'listings.parquet'), index=False)
+    history.to_parquet(os.path.join(tmp_dir, 'history'), partition_cols=['month'], index=False)
+
+    old_dir = SNAPSHOT_DIR + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(SNAPSHOT_DIR):
+        os.replace(SNAPSHOT_DIR, old_dir)
+    os.replace(tmp_dir, SNAPSHOT_DIR)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"Snapshot exported: {len(listings)} listings, {len(history)} history points "
+          f"in {time.time() - start:.2f}s -> {SNAPSHOT_DIR}")
+    return len(listings), len(history)
+
+
+def load_listings():
+    """Loads the listings snapshot as a DataFrame."""
+    return pd.read_parquet(LISTINGS_SNAPSHOT)
+
+
+def load_history(months=None, listing_ids=None):
+    """Loads history points, reading only the requested month partitions (e.g. ['2024-01'])."""
+    filters = []
+    if months:
+        filters.append(('month', 'in', list(months)))
+    if listing_ids:
+        filters.append(('listing_id', 'in', [str(lid) for lid in listing_ids]))
+    return pd.read_parquet(HISTORY_SNAPSHOT, filters=filters or None)
+
+
+if __name__ == "__main__":
+    export_snapshot()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+import aiohttp
+from src.scrapers.detail_parser import apply_details, has_details, parse_detail_page
+from src.scrapers.scraper_http import HEADERS
+from src.utils.page_archive import store_page
+from src.utils.rate_limit import AsyncTokenBucket
+
+DETAIL_CONCURRENCY = int(os.getenv('DETAIL_CONCURRENCY', '8'))   # requests in flight at once
+DETAIL_HOST_RATE = float(os.getenv('DETAIL_HOST_RATE', '2.0'))   # requests per second per host
+DETAIL_HOST_BURST = int(os.getenv('DETAIL_HOST_BURST', '4'))
+
+
+async def _fetch_page(session, semaphore, buckets, url):
+    """Returns the page HTML, or None if it could not be fetched."""
+    host = urlsplit(url).netloc
+    bucket = buckets.setdefault(host, AsyncTokenBucket(DETAIL_HOST_RATE, DETAIL_HOST_BURST))
+    async with semaphore:
+        await bucket.acquire()
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    print(f"HTTP {response.status} for {url}")
+                    return None
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"HTTP error for {url}: {e}")
+            return None
+
+
+async def _enrich_all(listings):
+    semaphore = asyncio.Semaphore(DETAIL_CONCURRENCY)
+    buckets = {}
+    timeout = aiohttp.ClientTimeout(total=20)
+    # One pooled session for all requests (keep-alive, shared cookies)
+    connector = aiohttp.TCPConnector(limit=DETAIL_CONCURRENCY)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+        pages = await asyncio.gather(*(_fetch_page(session, semaphore, buckets, listing['url'])
+                                       for listing in listings))
+
+    failed = []
+    for listing, page_html in zip(listings, pages):
+        if page_html is None:
+            failed.append(listing)
+            continue
+        store_page('detail', listing['id'], listing['url'], page_html)
+        try:
+            fields = parse_detail_page(page_html)
+        except Exception as e:
+            print(f"Error parsing details for {listing['id']}: {e}")
+            failed.append(listing)
+            continue
+        if not has_details(fields):
+            failed.append(listing)
+            continue
+        apply_details(listing, fields)
+    return failed
+
+
+def enrich_over_http(listings):
+    """Fills detail fields of `listings` in place from their server-rendered pages.
+
+    Returns the listings static extraction could not handle (fetch errors, pages without
+    the detail fields); only those need a browser.
+    """
+    if not listings:
+        return []
+    start = time.perf_counter()
+    failed = asyncio.run(_enrich_all(listings))
+    print(f"HTTP details: {len(listings) - len(failed)}/{len(listings)} pages extracted "
+          f"in {time.perf_counter() - start:.1f}s, {len(failed)} left for the browser")
+    return failed
@@ -0,0 +1,176 @@
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from lxml import html as lxml_html
+
+# Visible page text containing any of these means the listing is sold or taken down
+SOLD_MARKERS = ("kohde on poistunut", "myyty")
+
+
+def extract_toilet_from_text(text):
+    """Helper to extract toilet information from a Finnish text string."""
+    if not text:
+        return None
+    
+    text_lower = text.lower()
+    
+    # Check for "erillinen wc" (separate toilet)
+    has_separate = "erillinen wc" in text_lower or "erill. wc" in text_lower
+    
+    # Check for multiple toilets
+    # Patterns like "2 wc", "kaksi wc:tä", "3 x wc"
+    multi_patterns = [
+        r'(\d+)\s*(?:x|kpl)?\s*wc',
+        r'(kaksi|kolme|neljä)\s*wc:tä',
+        r'wc:itä\s*(\d+)',
+    ]
+    
+    found_count = None
+    for pattern in multi_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            found_count = match.group(1)
+            # Convert text numbers to digits
+            num_map = {"kaksi": "2", "kolme": "3", "neljä": "4"}
+            found_count = num_map.get(found_count, found_count)
+            break
+            
+    # If no explicit count like "2 wc", but "wc" mentioned multiple times
+    if not found_count:
+        wc_count = text_lower.count('wc')
+        if wc_count >= 2:
+            found_count = str(wc_count)
+
+    if has_separate and found_count and int(found_count) > 1:
+        return f"{found_count} WC (sis. erillinen WC)"
+    elif has_separate:
+        return "Erillinen WC"
+    elif found_count:
+        return f"{found_count} WC"
+        
+    return None
+
+
+def _text(element):
+    return element.text_content().strip()
+
+
+def _events_open_house(doc):
+    """Open house times from schema.org Event blocks, e.g. '18.01. klo 13:00, 25.01. klo 14:00'."""
+    for script in doc.xpath("//script[@type='application/ld+json']"):
+        try:
+            data = json.loads(script.text_content())
+        except ValueError:
+            continue
+        oh_info = []
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if isinstance(item, dict) and item.get('@type') == 'Event':
+                name = item.get('name', '')
+                start = item.get('startDate', '')
+                if start:
+                    try:
+                        dt_obj = datetime.fromisoformat(start.replace('Z', '+00:00'))
+                        oh_info.append(f"{dt_obj.strftime('%d.%m. klo %H:%M')}")
+                    except ValueError:
+                        if name: oh_info.append(name)
+        if oh_info:
+            return ", ".join(oh_info)
+    return None
+
+
+def _viewings_open_house(doc):
+    """Open house times from the 'public-viewings' list, joined with ' | '."""
+    viewings = []
+    for item in doc.xpath("//ul[contains(concat(' ', normalize-space(@class), ' '), ' public-viewings ')]"
+                          "/li[contains(concat(' ', normalize-space(@class), ' '), ' public-viewings__item ')]"):
+        date_elems = item.xpath(".//b")
+        content_elems = item.xpath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' public-viewings__item-content ')]")
+        if date_elems and content_elems:
+            viewings.append(f"{_text(date_elems[0])} {_text(content_elems[0])}")
+    return " | ".join(viewings) if viewings else None
+
+
+def parse_detail_page(page_html):
+    """Extracts the listing detail fields from a detail page's HTML.
+
+    Pure function over the page source, shared by the HTTP and browser backends. Returns
+    only the fields that were found: sold, image, price_per_sqm, maintenance_fee, toilets,
+    description_toilets (fallback from the free text) and open_house.
+    """
+    doc = lxml_html.fromstring(page_html)
+    fields = {}
+
+    # Structured data first: scripts are dropped below before reading the visible text
+    open_house = _events_open_house(doc) or _viewings_open_house(doc)
+
+    # 1. High-res image from the gallery, else og:image
+    gallery = doc.xpath("//*[contains(concat(' ', normalize-space(@class), ' '), ' galleria-stage ')]//img/@src")
+    og_image = doc.xpath("//meta[@property='og:image']/@content")
+    if gallery and gallery[0]:
+        fields['image'] = gallery[0]
+    elif og_image and og_image[0]:
+        fields['image'] = og_image[0]
+
+    # 2. Definition lists (dl > dt, dd)
+    for dt in doc.iter('dt'):
+        key = _text(dt).lower()
+        dd = dt.getnext()
+        while dd is not None and dd.tag != 'dd':
+            dd = dd.getnext()
+        if dd is None:
+            continue
+        value = _text(dd)
+        if "neliöhinta" in key:
+            fields['price_per_sqm'] = value
+        elif "hoitovastike" in key:
+            fields['maintenance_fee'] = value
+        elif "huoneiston kokoonpano" in key:
+            toilet_info = extract_toilet_from_text(value)
+            if toilet_info:
+                fields['toilets'] = toilet_info
+
+    descriptions = doc.xpath("//*[contains(concat(' ', normalize-space(@class), ' '), ' paragraph--keep-formatting ')]")
+    if descriptions:
+        toilet_info = extract_toilet_from_text(_text(descriptions[0]))
+        if toilet_info:
+            fields['description_toilets'] = toilet_info
+
+    # 3. Sold / removed, judged on the visible text only
+    for element in doc.xpath("//script | //style | //noscript"):
+        element.drop_tree()
+    body = doc.find('body')
+    page_text_lower = (body if body is not None else doc).text_content().lower()
+    if any(marker in page_text_lower for marker in SOLD_MARKERS):
+        fields['sold'] = True
+        fields['open_house'] = ""
+    if open_house:
+        fields['open_house'] = open_house
+    return fields
+
+
+def has_details(fields):
+    """True if static extraction found the page content (and not e.g. a consent or error page)."""
+    return bool(fields.get('sold') or {'price_per_sqm', 'maintenance_fee'} & fields.keys())
+
+
+def apply_details(listing, fields):
+    """Merges fields from parse_detail_page into a listing the way the browser scraper always has."""
+    for key in ('sold', 'image', 'price_per_sqm', 'maintenance_fee', 'toilets', 'open_house'):
+        if key in fields:
+            listing[key] = fields[key]
+    if 'description_toilets' in fields and (not listing.get('toilets') or listing['toilets'] == "N/A"):
+        listing['toilets'] = fields['description_toilets']
+    return listing
+
+
+if __name__ == "__main__":
+    # Offline check against a saved detail page: python src/scrapers/detail_parser.py page.html
+    with open(sys.argv[1], 'r') as f:
+        page_html = f.read()
+    start = time.perf_counter()
+    fields = parse_detail_page(page_html)
+    print(f"Parsed in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(json.dumps(fields, indent=2, ensure_ascii=False))
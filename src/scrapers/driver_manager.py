@@ -0,0 +1,371 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from src.scrapers.readiness import wait_until_settled
+
+try:
+    import psutil
+except ImportError:  # memory based recycling is skipped without it
+    psutil = None
+
+DRIVER_POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '2'))          # browsers kept warm
+DRIVER_MAX_PAGES = int(os.getenv('DRIVER_MAX_PAGES', '200'))        # recycle a browser after this many page loads
+DRIVER_MAX_MEMORY_MB = int(os.getenv('DRIVER_MAX_MEMORY_MB', '1500'))  # ... or when its processes use more than this
+BROWSER_PROFILE = os.getenv('BROWSER_PROFILE', 'lean').lower()       # 'lean' blocks what we never read, 'full' loads everything
+CONSENT_URL = "https://asunnot.oikotie.fi/myytavat-asunnot"
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Requests the lean profile drops. We only read text and the image URLs, so pictures,
+# fonts and media are never needed, nor are ad and analytics hosts. The consent dialog
+# is served from Oikotie's own domain and is not affected.
+BLOCKED_URL_PATTERNS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.mp4*", "*.webm*", "*.m3u8*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*adservice.google.*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*hotjar.io*",
+    "*gemius.pl*", "*adform.net*", "*adnxs.com*", "*criteo.com*", "*criteo.net*",
+    "*scorecardresearch.com*", "*cxense.com*", "*rubiconproject.com*", "*pubmatic.com*",
+    "*casalemedia.com*", "*smartadserver.com*", "*amazon-adsystem.com*", "*bing.com/bat*",
+    "*snap.licdn.com*", "*tiktok.com*",
+]
+
+# Content settings: 2 = block
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+}
+
+
+def build_options(profile=BROWSER_PROFILE):
+    """Chrome options shared by every scraper."""
+    options = Options()
+    options.add_argument("--headless=new") # Modern headless mode
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    # Network events feed the per-page byte counts in PageMetrics
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if profile == 'lean':
+        options.add_experimental_option("prefs", LEAN_PREFS)
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--mute-audio")
+        options.add_argument("--autoplay-policy=user-gesture-required")
+        # Return once the DOM is parsed; callers wait for the elements they need
+        options.page_load_strategy = 'eager'
+    return options
+
+
+class PageMetrics:
+    """Thread-safe record of page loads: load time, bytes transferred and requests blocked."""
+
+    def __init__(self, keep=500):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=keep)  # (url, seconds, bytes, blocked) of the latest pages
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pages = 0
+            self.seconds = 0.0
+            self.bytes = 0
+            self.blocked = 0
+            self.recent.clear()
+
+    def record(self, url, seconds, transferred, blocked):
+        with self._lock:
+            self.pages += 1
+            self.seconds += seconds
+            self.bytes += transferred
+            self.blocked += blocked
+            self.recent.append((url, seconds, transferred, blocked))
+
+    def summary(self):
+        with self._lock:
+            pages = self.pages or 1
+            return {'pages': self.pages, 'avg_seconds': self.seconds / pages,
+                    'avg_kb': self.bytes / pages / 1024, 'total_mb': self.bytes / (1024 * 1024),
+                    'blocked': self.blocked}
+
+    def report(self, label="Browser"):
+        summary = self.summary()
+        if summary['pages']:
+            print(f"{label}: {summary['pages']} pages, {summary['avg_kb']:.0f} KB and "
+                  f"{summary['avg_seconds']:.2f}s per page on average "
+                  f"({summary['total_mb']:.1f} MB total, {summary['blocked']} requests blocked)")
+        return summary
+
+
+def accept_cookies(driver):
+    """Clicks 'Hyväksy kaikki' in Oikotie's consent iframe if it is shown."""
+    try:
+        print("Looking for cookie iframe...")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "iframe")))
+        iframes = driver.find_elements(By.TAG_NAME, "iframe")
+        cookie_iframe = None
+        for ifr in iframes:
+            src = ifr.get_attribute("src")
+            if src and "cmpv2" in src:
+                cookie_iframe = ifr
+                break
+
+        if cookie_iframe:
+            driver.switch_to.frame(cookie_iframe)
+            accept_btn = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Hyväksy kaikki')]"))
+            )
+            try:
+                accept_btn.click()
+            except Exception:
+                driver.execute_script("arguments[0].click();", accept_btn)
+            driver.switch_to.default_content()
+            wait_until_settled(driver, 'consent')
+    except Exception as e:
+        print(f"Cookie banner error (skipping): {e}")
+        driver.switch_to.default_content()
+
+
+class _Session:
+    """A running browser and its bookkeeping."""
+
+    def __init__(self, slot, profile=BROWSER_PROFILE, metrics=None):
+        self.slot = slot
+        self.driver = webdriver.Chrome(options=build_options(profile))
+        self.pages = 0
+        self.consent = False
+        self.started = time.time()
+        self.metrics = metrics
+        self._page = None  # (url, load seconds) of the page whose traffic is still being counted
+        if profile == 'lean':
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+            except Exception as e:
+                print(f"Could not enable request blocking in browser {slot}: {e}")
+        # Count and time page loads without changing how callers use the driver
+        original_get = self.driver.get
+        def counted_get(url):
+            self.finish_page()
+            self.pages += 1
+            start = time.perf_counter()
+            try:
+                return original_get(url)
+            finally:
+                self._page = (url, time.perf_counter() - start)
+        self.driver.get = counted_get
+
+    def _network_totals(self):
+        """Drains the performance log: (bytes received, requests blocked) since the last call."""
+        transferred = blocked = 0
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            return 0, 0
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            if method == "Network.loadingFinished":
+                transferred += message["params"].get("encodedDataLength", 0)
+            elif method == "Network.loadingFailed" and message["params"].get("blockedReason"):
+                blocked += 1
+        return int(transferred), blocked
+
+    def finish_page(self):
+        """Records the current page. Its traffic counts until the next load or the end of the lease."""
+        transferred, blocked = self._network_totals()
+        if self._page and self.metrics is not None:
+            url, seconds = self._page
+            self.metrics.record(url, seconds, transferred, blocked)
+        self._page = None
+
+    def healthy(self):
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def memory_mb(self):
+        """Resident memory of chromedriver and all its browser processes, None if unknown."""
+        if psutil is None:
+            return None
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except (psutil.Error, AttributeError):
+            return None
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error closing browser {self.slot}: {e}")
+
+
+class DriverManager:
+    """Keeps a small pool of warm, health-checked Chrome sessions shared by all scrapers.
+
+    Callers lease a driver with `with manager.lease() as driver:`. Browsers stay open
+    between leases (and refreshes) and are replaced when they stop responding, after
+    `max_pages` page loads or above `max_memory_mb`.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES, max_memory_mb=DRIVER_MAX_MEMORY_MB,
+                 profile=BROWSER_PROFILE):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.profile = profile
+        self.metrics = PageMetrics()
+        self._idle = []
+        self._free_slots = list(range(self.size))
+        self._cond = threading.Condition()
+        self._closed = False
+        self._cookies = []  # consent cookies, replayed into every new browser
+
+    def _start(self, slot):
+        start = time.perf_counter()
+        session = _Session(slot, self.profile, self.metrics)
+        print(f"Browser {slot} started in {time.perf_counter() - start:.1f}s ({self.profile} profile)")
+        return session
+
+    def _needs_recycle(self, session):
+        if session.pages >= self.max_pages:
+            return f"{session.pages} pages loaded"
+        memory = session.memory_mb()
+        if memory is not None and memory > self.max_memory_mb:
+            return f"{memory:.0f} MB in use"
+        return None
+
+    def _acquire(self):
+        with self._cond:
+            while not self._idle and not self._free_slots:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            slot = self._free_slots.pop(0)
+        try:
+            return self._start(slot)
+        except Exception:
+            with self._cond:
+                self._free_slots.append(slot)
+                self._cond.notify()
+            raise
+
+    def _release(self, session):
+        session.finish_page()
+        reason = self._needs_recycle(session) or (None if session.healthy() else "not responding")
+        if reason or self._closed:
+            if reason:
+                print(f"Recycling browser {session.slot} ({reason})")
+            session.quit()
+            with self._cond:
+                self._free_slots.append(session.slot)
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, consent=True):
+        """Yields a warm driver for exclusive use; with `consent`, cookies are accepted once per browser."""
+        session = self._acquire()
+        if not session.healthy():
+            print(f"Browser {session.slot} is not responding, restarting it")
+            session.quit()
+            try:
+                session = self._start(session.slot)
+            except Exception:
+                with self._cond:
+                    self._free_slots.append(session.slot)
+                    self._cond.notify()
+                raise
+        try:
+            if consent and not session.consent:
+                self._ensure_consent(session)
+            yield session.driver
+        finally:
+            self._release(session)
+
+    def _ensure_consent(self, session):
+        """Replays known consent cookies into a new browser, or clicks through the banner once."""
+        driver = session.driver
+        driver.get(CONSENT_URL)
+        if self._cookies:
+            for cookie in self._cookies:
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    print(f"Could not restore cookie {cookie.get('name')}: {e}")
+        else:
+            accept_cookies(driver)
+            self._cookies = driver.get_cookies()
+        session.consent = True
+
+    def prewarm(self, count=None, background=True):
+        """Starts browsers (and accepts consent) ahead of the first refresh."""
+        def warm():
+            sessions = []
+            for _ in range(min(count or self.size, self.size)):
+                try:
+                    sessions.append(self._acquire())
+                except Exception as e:
+                    print(f"Browser prewarm failed: {e}")
+                    break
+            for session in sessions:
+                try:
+                    self._ensure_consent(session)
+                except Exception as e:
+                    print(f"Browser prewarm failed: {e}")
+                finally:
+                    self._release(session)
+        if background:
+            threading.Thread(target=warm, daemon=True).start()
+        else:
+            warm()
+
+    def stats(self):
+        with self._cond:
+            pool = {'size': self.size, 'idle': len(self._idle),
+                    'running': self.size - len(self._free_slots), 'profile': self.profile}
+        pool['pages'] = self.metrics.summary()
+        return pool
+
+    def shutdown(self):
+        """Closes all idle browsers; leased ones are closed when they are returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.quit()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_driver_manager():
+    """Returns the process-wide driver manager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DriverManager()
+            atexit.register(_manager.shutdown)
+        return _manager
@@ -0,0 +1,118 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.rate_limit import RateLimiter, host_limiter
+
+SEARCH_MAX_PAGES = int(os.getenv('SEARCH_MAX_PAGES', '50'))      # safety cap for runaway searches
+SEARCH_CONCURRENCY = int(os.getenv('SEARCH_CONCURRENCY', '4'))   # search pages fetched at once
+SEARCH_RATE = float(os.getenv('SEARCH_RATE', '2.0'))             # search page requests per second
+
+
+def page_url(url, page):
+    sep = '&' if '?' in url else '?'
+    return f"{url}{sep}pagination={page}"
+
+
+def plan_pages(total, page_size, max_pages=SEARCH_MAX_PAGES):
+    """Page numbers needed for `total` hits at `page_size` cards per page.
+
+    None if the total is unknown or implausible (more pages than `max_pages`); the
+    pages are then walked one by one instead.
+    """
+    if not total or not page_size:
+        return None
+    pages = math.ceil(total / page_size)
+    if pages > max_pages:
+        print(f"Search reports {total} hits ({pages} pages, over SEARCH_MAX_PAGES); walking the pages instead.")
+        return None
+    return list(range(1, pages + 1))
+
+
+def collect_pages(fetch_page, key, url=None, workers=SEARCH_CONCURRENCY, rate=SEARCH_RATE, max_pages=SEARCH_MAX_PAGES):
+    """Fetches every page of a search and returns its cards in page order, without duplicates.
+
+    `fetch_page(page)` returns (cards, total) for one page; cards is None when the page
+    could not be read. The first page's reported total and card count decide the page
+    set, and the rest is fetched by `workers` threads, one round of `workers` pages at a
+    time; a page without cards ends the search early. All searches against the host of
+    `url` share one limit of `rate` pages per second.
+    Without a usable total the pages are walked one by one until one brings nothing new.
+    Returns None if the first page had no cards.
+    """
+    limiter = host_limiter('search', url, rate) if url else RateLimiter(rate)
+    def fetch(page):
+        limiter.wait()
+        try:
+            return fetch_page(page)
+        except Exception as e:
+            print(f"Error fetching search page {page}: {e}")
+            return None, None
+
+    first, total = fetch(1)
+    if not first:
+        return None
+    results = {1: first}
+    planned = plan_pages(total, len(first), max_pages)
+    if planned is not None:
+        remaining = planned[1:]
+        if remaining:
+            workers = max(1, min(workers, len(remaining)))
+            print(f"{total} hits: fetching pages 2-{planned[-1]} with {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for start in range(0, len(remaining), workers):
+                    batch = remaining[start:start + workers]
+                    for page, (cards, _) in zip(batch, pool.map(fetch, batch)):
+                        results[page] = cards
+                    if any(not results[page] for page in batch):
+                        if batch[-1] != planned[-1]:
+                            print(f"A page before {planned[-1]} came back empty; stopping early.")
+                        break
+            # Empty pages past the end of the results are not worth a warning
+            while len(results) > 1 and not results[max(results)]:
+                del results[max(results)]
+    else:
+        seen = {key(card) for card in first}
+        for page in range(2, max_pages + 1):
+            cards, _ = fetch(page)
+            new = [card for card in cards or [] if key(card) not in seen]
+            if not new:
+                break
+            results[page] = cards
+            seen.update(key(card) for card in new)
+
+    return merge_pages(results, key, len(first), total if planned is not None else None)
+
+
+def merge_pages(results, key, page_size, total=None):
+    """Joins {page: cards} in page order, dropping repeated cards and reporting suspicious pages.
+
+    A page whose cards all appeared on earlier pages is reported as a duplicate (the site
+    serves an earlier page again when pages shift or run out). A page other than the last
+    with fewer cards than the first is reported as truncated, as is a search that ends
+    with fewer unique cards than its reported total.
+    """
+    merged = []
+    seen = {}
+    last_page = max(results)
+    problems = []
+    for page in sorted(results):
+        cards = results[page]
+        if cards is None:
+            problems.append(f"page {page} failed")
+            continue
+        keys = [key(card) for card in cards]
+        if keys and all(k in seen for k in keys):
+            problems.append(f"page {page} duplicates page {seen[keys[0]]}")
+            continue
+        if page != last_page and len(cards) < page_size:
+            problems.append(f"page {page} is truncated ({len(cards)}/{page_size} cards)")
+        for k, card in zip(keys, cards):
+            if k not in seen:
+                seen[k] = page
+                merged.append(card)
+    if total and len(merged) < total:
+        problems.append(f"{len(merged)} unique cards for {total} reported hits")
+    for problem in problems:
+        print(f"Pagination warning: {problem}")
+    print(f"Collected {len(merged)} cards from {len(results)} pages.")
+    return merged
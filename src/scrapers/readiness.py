@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+SELECTOR_MEMORY_PATH = os.path.join('data', 'selectors.json')
+
+# Returns the first selector (in the given order) that matches anything on the page
+_FIRST_MATCH_JS = """
+for (const selector of arguments[0]) {
+    try { if (document.querySelector(selector)) return selector; } catch (e) {}
+}
+return null;
+"""
+
+# Cheap fingerprint of the page: element count, resources requested so far and load state
+_PAGE_STATE_JS = """
+return [document.getElementsByTagName('*').length,
+        performance.getEntriesByType('resource').length,
+        document.readyState];
+"""
+
+
+class WaitMetrics:
+    """Thread-safe durations of readiness waits, grouped by wait name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.waits = {}  # name -> [count, total seconds, max seconds, timeouts]
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            entry = self.waits.setdefault(name, [0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            if not ok:
+                entry[3] += 1
+
+    def summary(self):
+        with self._lock:
+            return {name: {'count': count, 'avg_seconds': total / count, 'max_seconds': longest, 'timeouts': timeouts}
+                    for name, (count, total, longest, timeouts) in self.waits.items()}
+
+    def report(self):
+        summary = self.summary()
+        for name, s in sorted(summary.items()):
+            print(f"Wait '{name}': {s['count']}x, {s['avg_seconds']:.2f}s on average, "
+                  f"{s['max_seconds']:.2f}s max, {s['timeouts']} timeouts")
+        return summary
+
+
+class SelectorMemory:
+    """Remembers which selector matched last time for each wait, persisted in data/selectors.json."""
+
+    def __init__(self, path=SELECTOR_MEMORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._winners = None
+
+    def _load(self):
+        if self._winners is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._winners = json.load(f)
+            except (OSError, ValueError):
+                self._winners = {}
+        return self._winners
+
+    def winner(self, name):
+        with self._lock:
+            return self._load().get(name)
+
+    def order(self, name, selectors):
+        """`selectors` with last time's winner moved to the front."""
+        winner = self.winner(name)
+        if winner in selectors:
+            return [winner] + [s for s in selectors if s != winner]
+        return list(selectors)
+
+    def remember(self, name, selector):
+        with self._lock:
+            winners = self._load()
+            if winners.get(name) == selector:
+                return
+            winners[name] = selector
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'w') as f:
+                    json.dump(winners, f, indent=2)
+            except OSError as e:
+                print(f"Could not save selector memory: {e}")
+
+
+wait_metrics = WaitMetrics()
+selector_memory = SelectorMemory()
+
+
+def wait_for_any(driver, selectors, name, timeout=15, poll=0.2, fallbacks=()):
+    """Waits until any of `selectors` matches and returns the one that did (None on timeout).
+
+    All candidates are checked together on every poll, so a stale selector costs
+    nothing once another one matches. The winner is remembered under `name` and
+    tried first next time.
+
+    `fallbacks` are catch-all selectors that also match parts of the page before the
+    real content has rendered. They are only tried after `selectors` timed out, unless
+    one of them won last time (the site layout changed); even then every specific
+    selector is checked ahead of it on each poll.
+    """
+    ordered = selector_memory.order(name, selectors)
+    remembered = selector_memory.winner(name)
+    if remembered in fallbacks:
+        ordered.append(remembered)
+    start = time.perf_counter()
+    try:
+        winner = WebDriverWait(driver, timeout, poll_frequency=poll).until(
+            lambda d: d.execute_script(_FIRST_MATCH_JS, ordered))
+    except TimeoutException:
+        winner = None
+    if winner is None and fallbacks:
+        winner = driver.execute_script(_FIRST_MATCH_JS, list(fallbacks))
+    wait_metrics.record(name, time.perf_counter() - start, winner is not None)
+    if winner:
+        selector_memory.remember(name, winner)
+    return winner
+
+
+def wait_until_settled(driver, name, quiet=0.5, timeout=5, poll=0.1):
+    """Waits until the page stops changing: the DOM is parsed and neither the element count
+    nor the number of network requests has changed for `quiet` seconds.
+
+    Returns True when the page settled, False when `timeout` ran out first (the page is
+    then used as it is).
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    last_state, stable_since = None, start
+    settled = False
+    while True:
+        now = time.perf_counter()
+        try:
+            state = driver.execute_script(_PAGE_STATE_JS)
+        except Exception:
+            state = None
+        if state != last_state:
+            last_state, stable_since = state, now
+        elif state and state[2] != 'loading' and now - stable_since >= quiet:
+            settled = True
+            break
+        if now >= deadline:
+            break
+        time.sleep(poll)
+    wait_metrics.record(name, time.perf_counter() - start, settled)
+    return settled
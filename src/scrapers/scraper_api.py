@@ -1,68 +1,154 @@
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
 import requests
-import json
-from src.utils.config_parser import parse_config
-
-def fetch_via_api():
-    # 1. First request to main page to get cookies/tokens
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36",
-        "Accept": "application/json, text/plain, */*",
-        "Referer": "https://asunnot.oikotie.fi/myytavat-asunnot"
-    })
-    
-    # We need the params.
-    # From config: "houses for selling on herttoniemi area and at least 4 rooms"
-    # Parser gives params for URL query.
-    # API might expect same params.
-    
-    with open('config.txt', 'r') as f:
-        config_str = f.read()
-    _, params = parse_config(config_str)
-    
-    # Base API params
-    api_params = {
-        'cardType': 100,
-        'limit': 24,
-        'offset': 0,
-        'sortBy': 'published_desc', # Default sort
-    }
-    
-    # Merge parser params
-    # Note: Parser returns 'roomCount[]', 'buildingType[]' etc.
-    # Requests handles list items if passed as list of tuples or list in dict?
-    # requests params support keys with []
-    
-    combined_params = api_params.copy()
-    combined_params.update(params)
-    
-    print("Combined Params:", combined_params)
-    
-    # Step 1: Hit the search page to prime the session
-    print("Priming session...")
-    main_url = "https://asunnot.oikotie.fi/myytavat-asunnot"
-    resp_main = session.get(main_url)
-    print(f"Main Page Status: {resp_main.status_code}")
-    
-    # Step 2: Call API
-    api_url = "https://asunnot.oikotie.fi/api/cards"
-    print(f"Calling API: {api_url}")
-    
-    resp_api = session.get(api_url, params=combined_params)
-    print(f"API Status: {resp_api.status_code}")
-    
-    if resp_api.status_code == 200:
-        data = resp_api.json()
-        print(f"Got {len(data.get('cards', []))} cards.")
-        print(json.dumps(data.get('cards', [])[:1], indent=2))
-        return data.get('cards', [])
-        
-    elif resp_api.status_code == 401:
-        print("401 Unauthorized. Access denied.")
-    else:
-        print(f"Failed: {resp_api.text[:200]}")
-        
-    return []
+from requests.adapters import HTTPAdapter
+from src.scrapers.pagination import SEARCH_CONCURRENCY, collect_pages
+from src.scrapers.scraper_http import HEADERS, card_to_listing, filter_allowed
+
+API_PATH = "/api/cards"
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '24'))     # cards per request
+API_MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', '4'))  # per request, for 401/429/5xx
+API_BACKOFF = float(os.getenv('API_BACKOFF', '2.0'))      # seconds, doubled on every retry
+
+# The search page carries the tokens the API expects back as OTA-* headers:
+# <meta name="api-token" content="..."> <meta name="cuid" content="..."> <meta name="loaded" content="...">
+TOKEN_META = {'api-token': 'OTA-token', 'cuid': 'OTA-cuid', 'loaded': 'OTA-loaded'}
+_META_RE = re.compile(r'<meta\s+name="(api-token|cuid|loaded)"\s+content="([^"]*)"', re.IGNORECASE)
+
+
+class ApiError(Exception):
+    """Raised when the cards API keeps refusing a request."""
+
+
+class CardsApiClient:
+    """Client for the site's JSON cards API, shared by all pages of a search.
+
+    One pooled requests.Session keeps connections and cookies. The session is primed
+    from the search page (cookies plus the OTA token headers) and primed again when
+    the API answers 401. 429 and 5xx answers are retried with exponential backoff,
+    honouring Retry-After.
+    """
+
+    def __init__(self, search_url, session=None):
+        parts = urlsplit(search_url)
+        self.search_url = search_url
+        self.api_url = f"{parts.scheme}://{parts.netloc}{API_PATH}"
+        self.params = [(k, v) for k, v in parse_qsl(parts.query) if k not in ('pagination', 'offset', 'limit')]
+        if not any(k == 'cardType' for k, _ in self.params):
+            self.params.append(('cardType', '101' if 'vuokrattavat' in parts.path else '100'))
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, SEARCH_CONCURRENCY))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(HEADERS)
+        self.session.headers.update({'Accept': 'application/json, text/plain, */*', 'Referer': search_url})
+        self._prime_lock = threading.Lock()
+        self._primed_at = 0.0
+
+    def prime(self):
+        """Loads the search page for cookies and copies its token meta tags into the OTA headers."""
+        with self._prime_lock:
+            started = time.monotonic()
+            response = self.session.get(self.search_url, timeout=15)
+            response.raise_for_status()
+            tokens = dict(_META_RE.findall(response.text))
+            for meta, header in TOKEN_META.items():
+                if meta in tokens:
+                    self.session.headers[header] = tokens[meta]
+            self._primed_at = started
+            print(f"API session primed ({', '.join(sorted(tokens)) or 'no tokens'} found)")
+
+    def _reprime(self, since):
+        # Parallel pages hitting 401 together only re-prime once
+        if self._primed_at <= since:
+            self.prime()
+
+    def fetch_page(self, offset, limit=API_PAGE_SIZE):
+        """Returns the decoded JSON for one slice of the search ({'cards': [...], 'found': total})."""
+        params = self.params + [('limit', limit), ('offset', offset), ('sortBy', 'published_desc')]
+        delay = API_BACKOFF
+        for attempt in range(API_MAX_RETRIES + 1):
+            requested_at = time.monotonic()
+            try:
+                response = self.session.get(self.api_url, params=params, timeout=15)
+            except requests.RequestException as e:
+                if attempt == API_MAX_RETRIES:
+                    raise ApiError(f"cards API unreachable: {e}")
+                print(f"Cards API error at offset {offset} ({e}); retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay *= 2
+                continue
+            if response.status_code == 200:
+                return response.json()
+            if attempt == API_MAX_RETRIES:
+                break
+            if response.status_code == 401:
+                print(f"Cards API 401 at offset {offset}; priming the session again")
+                self._reprime(requested_at)
+            elif response.status_code == 429 or response.status_code >= 500:
+                wait = delay
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    wait = max(wait, int(retry_after))
+                print(f"Cards API {response.status_code} at offset {offset}; retrying in {wait:.0f}s")
+                time.sleep(wait)
+                delay *= 2
+            else:
+                break
+        raise ApiError(f"cards API answered {response.status_code} at offset {offset}")
+
+
+def fetch_search_api(url, allowed_locations=None, session=None):
+    """Collects search results from the JSON cards API. Returns None if the API cannot be used.
+
+    Pages of API_PAGE_SIZE cards are requested by offset; the first answer's 'found'
+    count plans the rest, which are fetched concurrently like the HTML search pages.
+    """
+    client = CardsApiClient(url, session)
+    try:
+        client.prime()
+    except requests.RequestException as e:
+        print(f"Could not prime the API session: {e}")
+        return None
+
+    def fetch_page(page):
+        offset = (page - 1) * API_PAGE_SIZE
+        print(f"[API] offset {offset}")
+        try:
+            data = client.fetch_page(offset)
+        except ApiError as e:
+            print(e)
+            return None, None
+        listings = []
+        for card in data.get('cards') or []:
+            try:
+                listing = card_to_listing(card)
+            except Exception as e:
+                print(f"Error parsing card {card.get('id') if isinstance(card, dict) else card}: {e}")
+                continue
+            if listing['id']:
+                listings.append(listing)
+        return listings, data.get('found')
+
+    listings = collect_pages(fetch_page, key=lambda listing: listing['id'], url=client.api_url)
+    if listings is None:
+        return None
+    all_results = filter_allowed(listings, allowed_locations)
+    print(f"\nPhase 1 Complete. Found {len(all_results)} listings through the cards API.")
+    return all_results
+
 
 if __name__ == "__main__":
-    fetch_via_api()
+    # python src/scrapers/scraper_api.py [search url]; scripts/api_stub_server.py serves a local stand-in
+    import sys
+    from src.utils.config_parser import get_search_url_from_file, get_allowed_locations
+    if len(sys.argv) > 1:
+        search_url, allowed = sys.argv[1], None
+    else:
+        search_url, _, params = get_search_url_from_file('config.txt')
+        allowed = get_allowed_locations(params)
+    results = fetch_search_api(search_url, allowed)
+    print(f"{'API unavailable' if results is None else f'{len(results)} listings'}")
@@ -1,38 +1,35 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import time
-import json
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+import os
+from src.utils.listing import parse_cents, parse_number, format_price_per_sqm
+from src.scrapers.driver_manager import get_driver_manager
+from src.scrapers.readiness import wait_for_any
+from src.utils.config_parser import is_allowed, load_profiles
+from src.utils.geocoding import get_geocoder
 
-geolocator = Nominatim(user_agent="oikotie_tracker")
+CARD_SELECTORS = [
+    ".ListPage-item",
+    ".search-result",
+    "[data-test-id='listing-card']",
+]
+# Generic matches, only used when none of the above shows up
+CARD_FALLBACK_SELECTORS = ["article", ".card"]
 
-def parse_to_float(s):
-    """Helper to extract numbers from Finnish formatted strings"""
-    if not s or s == "N/A": return 0.0
-    try:
-        cleaned = s.replace('€', '').replace('m²', '').replace(' ', '').replace(',', '.').strip()
-        return float(cleaned)
-    except:
-        return 0.0
+# Etuovi search pages to read (comma separated ETUOVI_URLS); results are then limited to
+# the locations of the search profiles in config.txt
+ETUOVI_URLS = [u.strip() for u in os.getenv('ETUOVI_URLS', ','.join([
+    "https://www.etuovi.com/myytavat-asunnot/helsinki/herttoniemi",
+    "https://www.etuovi.com/myytavat-asunnot/helsinki/herttoniemenranta",
+    "https://www.etuovi.com/myytavat-asunnot/helsinki/kulosaari",
+])).split(',') if u.strip()]
 
-def fetch_from_etuovi():
+def fetch_from_etuovi(base_urls=None):
     """
-    Fetches listings from Etuovi.fi for Herttoniemi, Herttoniemenranta, and Kulosaari.
+    Fetches listings from the Etuovi.fi search pages in ETUOVI_URLS.
     Returns a list of listings in the same format as Oikotie scraper.
     """
-    
-    # Build search URLs for each area
-    # Etuovi uses different URL structure - we'll need to test and adjust
-    base_urls = [
-        "https://www.etuovi.com/myytavat-asunnot/helsinki/herttoniemi",
-        "https://www.etuovi.com/myytavat-asunnot/helsinki/herttoniemenranta",
-        "https://www.etuovi.com/myytavat-asunnot/helsinki/kulosaari"
-    ]
+    base_urls = base_urls or ETUOVI_URLS
+    allowed_locations = _profile_locations()
     
     # Add filters: 4-7 rooms, max 600k
     # Note: Etuovi URL parameters may differ from Oikotie
@@ -40,155 +37,135 @@ def fetch_from_etuovi():
     
     print(f"Starting Etuovi fetch...")
     
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(options=options)
-    
     try:
-        all_results = []
-        seen_ids = set()
+        with get_driver_manager().lease(consent=False) as driver:
+            all_results = []
+            seen_ids = set()
+            geocoder = get_geocoder()
         
-        for base_url in base_urls:
-            print(f"\nFetching from: {base_url}")
-            driver.get(base_url)
-            time.sleep(3)  # Wait for page load
+            for base_url in base_urls:
+                print(f"\nFetching from: {base_url}")
+                driver.get(base_url)
             
-            # Try to find listing cards
-            # Note: Etuovi uses different CSS selectors than Oikotie
-            # Common patterns: .ListPage-item, .card, article, etc.
-            selectors_to_try = [
-                ".ListPage-item",
-                ".search-result",
-                "article",
-                "[data-test-id='listing-card']",
-                ".card"
-            ]
+                # Try to find listing cards
+                # Note: Etuovi uses different CSS selectors than Oikotie
+                # Common patterns: .ListPage-item, .card, article, etc.
+                selector = wait_for_any(driver, CARD_SELECTORS, 'etuovi_cards', fallbacks=CARD_FALLBACK_SELECTORS)
+                cards = driver.find_elements(By.CSS_SELECTOR, selector) if selector else []
+                if cards:
+                    print(f"Found {len(cards)} cards with selector: {selector}")
             
-            cards = []
-            for selector in selectors_to_try:
-                try:
-                    found = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if found:
-                        cards = found
-                        print(f"Found {len(cards)} cards with selector: {selector}")
-                        break
-                except:
+                if not cards:
+                    print(f"No cards found for {base_url}")
                     continue
             
-            if not cards:
-                print(f"No cards found for {base_url}")
-                continue
-            
-            # Extract data from each card
-            for idx, card in enumerate(cards):
-                try:
-                    # Get link
-                    link_elem = card.find_element(By.TAG_NAME, "a")
-                    link = link_elem.get_attribute("href") if link_elem else ""
+                # Extract data from each card
+                for idx, card in enumerate(cards):
+                    try:
+                        # Get link
+                        link_elem = card.find_element(By.TAG_NAME, "a")
+                        link = link_elem.get_attribute("href") if link_elem else ""
                     
-                    if not link:
-                        continue
+                        if not link:
+                            continue
                     
-                    # Extract ID from URL
-                    # Etuovi URLs typically: https://www.etuovi.com/kohde/12345678
-                    card_id = link.split('/')[-1] if link else f"etuovi_{idx}"
+                        # Extract ID from URL
+                        # Etuovi URLs typically: https://www.etuovi.com/kohde/12345678
+                        card_id = link.split('/')[-1] if link else f"etuovi_{idx}"
                     
-                    if card_id in seen_ids:
-                        continue
-                    seen_ids.add(card_id)
+                        if card_id in seen_ids:
+                            continue
+                        seen_ids.add(card_id)
                     
-                    # Get card text
-                    text = card.text
-                    lines = [line.strip() for line in text.split('\n') if line.strip()]
+                        # Get card text
+                        text = card.text
+                        lines = [line.strip() for line in text.split('\n') if line.strip()]
                     
-                    # Extract address (usually first meaningful line)
-                    address = lines[0] if lines else "Unknown Address"
+                        # Extract address (usually first meaningful line)
+                        address = lines[0] if lines else "Unknown Address"
                     
-                    # Extract price
-                    price = "N/A"
-                    for line in lines:
-                        if '€' in line and 'm²' not in line:
-                            price = line
-                            break
+                        # Extract price
+                        price = "N/A"
+                        for line in lines:
+                            if '€' in line and 'm²' not in line:
+                                price = line
+                                break
                     
-                    # Extract size
-                    size = "N/A"
-                    for line in lines:
-                        if 'm²' in line and '€' not in line:
-                            size = line
-                            break
+                        # Extract size
+                        size = "N/A"
+                        for line in lines:
+                            if 'm²' in line and '€' not in line:
+                                size = line
+                                break
                     
-                    # Extract rooms
-                    rooms = "N/A"
-                    for line in lines:
-                        if 'h' in line.lower() and any(char.isdigit() for char in line):
-                            rooms = line
-                            break
+                        # Extract rooms
+                        rooms = "N/A"
+                        for line in lines:
+                            if 'h' in line.lower() and any(char.isdigit() for char in line):
+                                rooms = line
+                                break
                     
-                    # Try to get image
-                    image_url = ""
-                    try:
-                        img = card.find_element(By.TAG_NAME, "img")
-                        image_url = img.get_attribute("src")
-                    except:
-                        pass
+                        # Try to get image
+                        image_url = ""
+                        try:
+                            img = card.find_element(By.TAG_NAME, "img")
+                            image_url = img.get_attribute("src")
+                        except:
+                            pass
                     
-                    # Calculate price per sqm
-                    price_val = parse_to_float(price)
-                    size_val = parse_to_float(size)
-                    price_per_sqm = "N/A"
-                    if price_val > 0 and size_val > 0:
-                        calculated = price_val / size_val
-                        price_per_sqm = f"{calculated:,.2f} €/m²".replace(',', ' ').replace('.', ',')
+                        # Calculate price per sqm
+                        price_cents = parse_cents(price)
+                        size_val = parse_number(size)
+                        price_per_sqm = "N/A"
+                        if price_cents and size_val:
+                            price_per_sqm = format_price_per_sqm(round(price_cents / size_val))
                     
-                    # Geocode address
-                    latitude = None
-                    longitude = None
-                    try:
-                        location = geolocator.geocode(address, country_codes='fi', timeout=10)
-                        if location:
-                            latitude = location.latitude
-                            longitude = location.longitude
-                    except:
-                        pass
+                        listing = {
+                            'id': f"etuovi_{card_id}",  # Prefix to distinguish from Oikotie
+                            'address': address,
+                            'price': price,
+                            'size': size,
+                            'rooms': rooms,
+                            'url': link,
+                            'image': image_url,
+                            'price_per_sqm': price_per_sqm,
+                            'maintenance_fee': "N/A",  # Usually not on search cards
+                            'open_house': "",
+                            'latitude': None,
+                            'longitude': None,
+                            'sold': False,
+                            'source': 'etuovi',
+                            'timestamp': time.time()
+                        }
                     
-                    listing = {
-                        'id': f"etuovi_{card_id}",  # Prefix to distinguish from Oikotie
-                        'address': address,
-                        'price': price,
-                        'size': size,
-                        'rooms': rooms,
-                        'url': link,
-                        'image': image_url,
-                        'price_per_sqm': price_per_sqm,
-                        'maintenance_fee': "N/A",  # Usually not on search cards
-                        'open_house': "",
-                        'latitude': latitude,
-                        'longitude': longitude,
-                        'sold': False,
-                        'source': 'etuovi',
-                        'timestamp': time.time()
-                    }
+                        if not is_allowed(address, allowed_locations):
+                            print(f"Skipping {card_id} (Address '{address}' not in allowed locations)")
+                            continue
                     
-                    all_results.append(listing)
+                        # Cached or district position now; unknown addresses are looked up in the background
+                        geocoder.locate(listing)
+                        all_results.append(listing)
                     
-                except Exception as e:
-                    print(f"Error parsing card {idx}: {e}")
-                    continue
+                    except Exception as e:
+                        print(f"Error parsing card {idx}: {e}")
+                        continue
         
-        print(f"\nEtuovi fetch complete. Found {len(all_results)} listings.")
-        return all_results
+            geocoder.resolve(all_results)
+            print(f"\nEtuovi fetch complete. Found {len(all_results)} listings.")
+            return all_results
         
     except Exception as e:
         print(f"Etuovi scraping error: {e}")
         return []
-    finally:
-        driver.quit()
+
+def _profile_locations():
+    """Allowed locations of all search profiles together, None if any profile allows everything."""
+    locations = []
+    for profile in load_profiles('config.txt'):
+        if not profile['allowed_locations']:
+            return None
+        locations.extend(profile['allowed_locations'])
+    return locations or None
 
 if __name__ == "__main__":
     listings = fetch_from_etuovi()
@@ -0,0 +1,235 @@
+import json
+import re
+import sys
+import time
+import requests
+from src.scrapers.pagination import collect_pages, page_url
+from src.utils.config_parser import is_allowed
+from src.utils.page_archive import store_page
+from src.utils.listing import format_area, format_euros, format_price_per_sqm, parse_cents, parse_number
+
+BASE_URL = "https://asunnot.oikotie.fi"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "fi-FI,fi;q=0.9,en;q=0.8",
+}
+
+# The rendered hit count of this search: <span class="search-result-controls__found" ng-bind="$ctrl.found">57</span>.
+# The '<title>... 32926 kpl' count is for the whole property type nationwide and is not used.
+_FOUND_RE = re.compile(r'class="search-result-controls__found[^"]*"[^>]*>\s*(\d[\d \u00a0]*)\s*<')
+
+
+def extract_ot_asunnot(html):
+    """Returns the `var otAsunnot = {...}` object embedded in a search page, None if it is missing."""
+    start = html.find('var otAsunnot')
+    if start == -1:
+        return None
+    brace = html.find('{', start)
+    if brace == -1:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(html, brace)
+    except ValueError as e:
+        print(f"Error parsing otAsunnot JSON: {e}")
+        return None
+    return data
+
+
+def find_cards(data):
+    """Finds the first list of card objects under a 'cards' key anywhere in the blob."""
+    if isinstance(data, dict):
+        cards = data.get('cards')
+        if isinstance(cards, list):
+            return cards
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+    for value in values:
+        cards = find_cards(value)
+        if cards is not None:
+            return cards
+    return None
+
+
+def find_found(data):
+    """The 'found' hit count next to the first 'cards' list in the blob, None if there is none."""
+    if isinstance(data, dict):
+        if isinstance(data.get('cards'), list):
+            found = data.get('found')
+            return found if isinstance(found, int) else None
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+    for value in values:
+        found = find_found(value)
+        if found is not None:
+            return found
+    return None
+
+
+def parse_total_count(html):
+    """Number of hits the rendered search reports, None if the page does not say (or says 0)."""
+    match = _FOUND_RE.search(html)
+    if not match:
+        return None
+    return int(re.sub(r'\D', '', match.group(1))) or None
+
+
+def _address_of(card):
+    building = card.get('buildingData') or {}
+    parts = [building.get('address'), building.get('district'), building.get('city')]
+    address = ", ".join(p.strip() for p in parts if p and p.strip())
+    return address or card.get('address') or "Unknown Address"
+
+
+def _image_of(card):
+    images = card.get('images') or {}
+    if isinstance(images, dict):
+        for key in ('wide', 'original', 'thumb'):
+            if images.get(key):
+                return images[key]
+    elif isinstance(images, list) and images:
+        first = images[0]
+        return first.get('url', '') if isinstance(first, dict) else first
+    return card.get('image') or ""
+
+
+def card_to_listing(card):
+    """Maps one card object from the site's JSON into our listing dict (same shape as the browser scraper)."""
+    card_id = str(card.get('id') or card.get('cardId') or '')
+    url = card.get('url') or f"{BASE_URL}/myytavat-asunnot/{card_id}"
+    if url.startswith('/'):
+        url = BASE_URL + url
+
+    price = card.get('price')
+    if isinstance(price, (int, float)):
+        price = format_euros(int(price) * 100)
+    price = price or "N/A"
+
+    size = card.get('size')
+    if isinstance(size, (int, float)):
+        size = format_area(size)
+    size = size or "N/A"
+
+    price_cents = parse_cents(price)
+    size_val = parse_number(size)
+    price_per_sqm = "N/A"
+    if price_cents and size_val:
+        price_per_sqm = format_price_per_sqm(round(price_cents / size_val))
+
+    coordinates = card.get('coordinates') or {}
+    # A card only says that a viewing is coming up; the date is read from the detail page
+    open_house = "Esittely" if card.get('nextViewing') or card.get('visits') else ""
+
+    listing = {
+        'id': card_id,
+        'address': _address_of(card),
+        'price': price,
+        'size': size,
+        'url': url,
+        'open_house': open_house,
+        'image': _image_of(card),
+        'price_per_sqm': price_per_sqm,
+        'maintenance_fee': "N/A",
+        'toilets': "N/A",
+        'latitude': coordinates.get('latitude'),
+        'longitude': coordinates.get('longitude'),
+        'sold': False,
+        'timestamp': time.time()
+    }
+    if card.get('roomConfiguration'):
+        listing['rooms'] = card['roomConfiguration']
+    return listing
+
+
+def parse_search_cards(html):
+    """Parses a search page into (listings, total_count) without any location filtering.
+
+    `listings` is None when the page carries no card data (the cards are then rendered
+    client-side and only a browser can see them).
+    """
+    data = extract_ot_asunnot(html)
+    cards = find_cards(data) if data else None
+    total = (find_found(data) if data else None) or parse_total_count(html)
+    if not cards:
+        return None, total
+
+    listings = []
+    for card in cards:
+        try:
+            listing = card_to_listing(card)
+        except Exception as e:
+            print(f"Error parsing card {card.get('id') if isinstance(card, dict) else card}: {e}")
+            continue
+        if listing['id']:
+            listings.append(listing)
+    return listings, total
+
+
+def filter_allowed(listings, allowed_locations):
+    """Drops listings whose address is outside the configured locations."""
+    kept = []
+    for listing in listings:
+        if not is_allowed(listing['address'], allowed_locations):
+            print(f"Skipping {listing['id']} (Address '{listing['address']}' not in allowed locations)")
+            continue
+        kept.append(listing)
+    return kept
+
+
+def parse_search_page(html, allowed_locations=None):
+    """Parses a search page into (listings, total_count), keeping only allowed locations.
+
+    `listings` is None when the page carries no card data.
+    """
+    listings, total = parse_search_cards(html)
+    if listings is None:
+        return None, total
+    return filter_allowed(listings, allowed_locations), total
+
+
+def fetch_search_http(url, allowed_locations=None, session=None):
+    """Collects search results with plain HTTP requests. Returns None if the pages carry no card data.
+
+    The first page's hit count decides how many pages there are; the rest are fetched
+    concurrently (see src/scrapers/pagination.py).
+    """
+    session = session or requests.Session()
+    session.headers.update(HEADERS)
+
+    def fetch_page(page):
+        current_url = page_url(url, page)
+        print(f"\n[Page {page}] Fetching URL: {current_url}")
+        try:
+            response = session.get(current_url, timeout=15)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"HTTP search error on page {page}: {e}")
+            return None, None
+        store_page('search', current_url, current_url, response.text)
+        return parse_search_cards(response.text)
+
+    listings = collect_pages(fetch_page, key=lambda listing: listing['id'], url=url)
+    if listings is None:
+        return None
+    all_results = filter_allowed(listings, allowed_locations)
+    print(f"\nPhase 1 Complete. Found {len(all_results)} listings over HTTP.")
+    return all_results
+
+
+if __name__ == "__main__":
+    # Offline check against a saved page: python src/scrapers/scraper_http.py debug/debug_page.html
+    path = sys.argv[1] if len(sys.argv) > 1 else 'debug/debug_page.html'
+    with open(path, 'r') as f:
+        html = f.read()
+    start = time.perf_counter()
+    listings, total = parse_search_page(html)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{path}: total hits {total}, "
+          f"{'no card data' if listings is None else f'{len(listings)} cards'} ({elapsed:.1f} ms)")
+    for listing in (listings or [])[:5]:
+        print(json.dumps(listing, ensure_ascii=False))
@@ -1,517 +1,460 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from src.utils.config_parser import get_search_url_from_file, get_allowed_locations
+from src.utils.config_parser import load_profiles
 from src.utils.storage import get_all_listings, LISTINGS_DIR, set_last_update
 import time
 import os
-import json
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.listing import parse_cents, parse_number, format_price_per_sqm
+from src.scrapers.pagination import SEARCH_CONCURRENCY, collect_pages, page_url
+from src.scrapers.scraper_http import fetch_search_http, is_allowed, parse_total_count
+from src.scrapers.scraper_api import fetch_search_api
+from src.scrapers.detail_parser import extract_toilet_from_text, parse_detail_page, apply_details
+from src.scrapers.detail_http import enrich_over_http
+from src.scrapers.driver_manager import get_driver_manager
+from src.scrapers.status_check import STATUS_RECHECK_HOURS, StatusCache, check_status_over_http
+from src.scrapers.readiness import wait_for_any, wait_until_settled, wait_metrics
+from src.utils.geocoding import get_geocoder
+from src.utils.page_archive import store_page
+from src.utils.rate_limit import RateLimiter, host_limiter
 
-geolocator = Nominatim(user_agent="oikotie_tracker")
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'selenium').lower()  # 'selenium', or 'api'/'http' (each falling back to the next)
+DETAIL_BACKEND = os.getenv('DETAIL_BACKEND', 'http').lower()  # 'http' (browser for failures) or 'selenium'
+DETAIL_WORKERS = int(os.getenv('DETAIL_WORKERS', '2'))      # browsers visiting detail pages in parallel
+DETAIL_RATE_LIMIT = float(os.getenv('DETAIL_RATE_LIMIT', '1.0'))  # detail page loads per second, all workers combined
 
-def parse_to_float(s):
-    """Helper to extract numbers from Finnish formatted strings (e.g., '468 000 €' or '75,5 m²')"""
-    if not s or s == "N/A": return 0.0
-    try:
-        # Remove spaces, €, m², then replace comma with dot
-        cleaned = s.replace('€', '').replace('m²', '').replace(' ', '').replace(',', '.').strip()
-        return float(cleaned)
-    except:
-        return 0.0
+# Candidate selectors for result cards, oldest site layouts last
+CARD_SELECTORS = [".cards__card", ".ot-card", "[data-test-id='card']"]
+# Catch-alls that also match page chrome; only used when none of the above shows up
+CARD_FALLBACK_SELECTORS = ["article[class*='card']", "div[class*='card']"]
+
+PROFILE_CONCURRENCY = int(os.getenv('PROFILE_CONCURRENCY', '3'))  # search profiles run at once
+CARD_EXTRACTION = os.getenv('CARD_EXTRACTION', 'script').lower()  # 'script' (one call per page) or 'elements'
+LISTING_PATHS = ('myytavat-asunnot', 'vuokrattavat-asunnot')  # card links to sale and rental listings
+BADGE_SELECTOR = ".card-badges badge, .ot-card__badge, [class*='badge']"
+
+# Same fields as _read_card_elements, for all cards in one round trip
+_READ_CARDS_JS = """
+const [selector, badgeSelector] = arguments;
+return Array.from(document.querySelectorAll(selector), card => {
+    const link = card.querySelector('a');
+    const img = card.querySelector('picture img') || card.querySelector('img');
+    return {
+        href: link ? link.href : '',
+        lines: card.innerText.split('\\n').map(l => l.trim()).filter(Boolean),
+        badges: Array.from(card.querySelectorAll(badgeSelector), b => b.innerText.trim()),
+        image: img ? img.src : ''
+    };
+});
+"""
+
+def search_profile(profile):
+    """Runs one profile's search with SEARCH_BACKEND: the cards API, then HTML over HTTP, then the browser."""
+    url, allowed_locations = profile['url'], profile['allowed_locations']
+    print(f"[{profile['name']}] Starting fetch from: {url}")
+    results = None
+    if SEARCH_BACKEND == 'api':
+        results = fetch_search_api(url, allowed_locations)
+        if results is None:
+            print(f"[{profile['name']}] Cards API unavailable. Falling back to HTTP.")
+    if results is None and SEARCH_BACKEND in ('api', 'http'):
+        results = fetch_search_http(url, allowed_locations)
+        if results is None:
+            print(f"[{profile['name']}] HTTP search found no card data. Falling back to Selenium.")
+    if results is None:
+        results = search_with_selenium(url, allowed_locations)
+    return results
+
+def search_profiles(profiles):
+    """Searches all profiles concurrently and merges the results.
+
+    A listing found by several profiles is kept once (first profile's card) and its
+    'profiles' field lists every profile that matched it.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(PROFILE_CONCURRENCY, len(profiles)))) as pool:
+        per_profile = list(pool.map(search_profile, profiles))
+
+    merged = {}
+    for profile, results in zip(profiles, per_profile):
+        for listing in results:
+            lid = str(listing['id'])
+            if lid not in merged:
+                listing['profiles'] = []
+                merged[lid] = listing
+            merged[lid]['profiles'].append(profile['name'])
+        print(f"[{profile['name']}] {len(results)} listings")
+    if len(profiles) > 1:
+        shared = sum(1 for listing in merged.values() if len(listing['profiles']) > 1)
+        print(f"{len(merged)} unique listings across {len(profiles)} profiles ({shared} matched more than one).")
+    return list(merged.values())
 
 def fetch_with_selenium():
-    url, base_url, params = get_search_url_from_file('config.txt')
-    allowed_locations = get_allowed_locations(params)
-    
-    if not url:
+    profiles = load_profiles('config.txt')
+    if not profiles:
         print("Invalid config")
         return []
 
-    print(f"Starting fetch from: {url}")
+    get_driver_manager().metrics.reset()
+    wait_metrics.reset()
 
-    options = Options()
-    options.add_argument("--headless=new") # Modern headless mode
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-    driver = webdriver.Chrome(options=options)
-    
     try:
-        all_results = []
-        seen_ids = set()
-        
-        # --- PHASE 1: Collect Listings from Search Page(s) ---
-        page = 1
-        max_pages = 5 # Safety limit
-        
-        while page <= max_pages:
-            sep = '&' if '?' in url else '?'
-            current_url = f"{url}{sep}pagination={page}"
-            print(f"\n[Page {page}] Loading URL: {current_url}")
-            
-            driver.get(current_url)
-            
-            # Cookie banner handling (only on page 1)
-            if page == 1:
-                try:
-                    print("Looking for cookie iframe...")
-                    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "iframe")))
-                    iframes = driver.find_elements(By.TAG_NAME, "iframe")
-                    cookie_iframe = None
-                    for ifr in iframes:
-                        src = ifr.get_attribute("src")
-                        if src and "cmpv2" in src:
-                            cookie_iframe = ifr
-                            break
-                    
-                    if cookie_iframe:
-                        driver.switch_to.frame(cookie_iframe)
-                        accept_btn = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Hyväksy kaikki')]"))
-                        )
-                        try:
-                            accept_btn.click()
-                        except:
-                            driver.execute_script("arguments[0].click();", accept_btn)
-                        driver.switch_to.default_content()
-                        time.sleep(2)
-                except Exception as e:
-                    print(f"Cookie banner error (skipping): {e}")
-                    driver.switch_to.default_content()
-
-            print(f"Waiting for cards on page {page}...")
-            selectors_to_try = [".cards__card", ".ot-card", "[data-test-id='card']", "article[class*='card']", "div[class*='card']"]
-            cards_loaded = False
-            for selector in selectors_to_try:
-                try:
-                    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                    cards_loaded = True
-                    break
-                except:
-                    continue
-            
-            if not cards_loaded:
-                print(f"No cards found on page {page}. Ending search.")
-                break
-            
-            # Extract basic info from cards on this page
-            cards_elems = []
-            for selector in selectors_to_try:
-                found = driver.find_elements(By.CSS_SELECTOR, selector)
-                if found:
-                    cards_elems = found
-                    break
-            
-            print(f"Found {len(cards_elems)} cards on page {page}.")
-            
-            page_listings_count = 0
-            for idx, card in enumerate(cards_elems):
-                try:
-                    href_elems = card.find_elements(By.TAG_NAME, "a")
-                    link = href_elems[0].get_attribute("href") if href_elems else ""
-                    
-                    if not link or 'myytavat-asunnot' not in link:
-                        continue
-                    
-                    card_id = link.split('/')[-1] if link else f"card_{idx}"
-                    if card_id in seen_ids:
-                        continue
-                    seen_ids.add(card_id)
-                    page_listings_count += 1
-                    
-                    text = card.text
-                    lines = [line.strip() for line in text.split('\n') if line.strip()]
-                    # Skip promotional labels like "Plus" or "Uusi" if they are at the top
-                    address = "Unknown Address"
-                    skip_labels = ["Plus", "Uusi", "Uutuus", "Nostettu", "Samankaltaisia asuntoja lähialueilta"]
-                    for line in lines:
-                        if line not in skip_labels:
-                            address = line
-                            break
-                    
-                    if "Samankaltaisia" in address:
-                        continue
-                        
-                    # Filter by allowed locations (if configured)
-                    # This prevents picking up "Nearby" or generic ad listings
-                    if allowed_locations:
-                        # address format: "Street, Area, City"
-                        # allowed_locations format: ["Herttoniemi", "Kulosaari"]
-                        # Check if any allowed location is in the address
-                        # Case insensitive check
-                        addr_lower = address.lower()
-                        match_found = False
-                        for loc in allowed_locations:
-                            if loc.lower() in addr_lower:
-                                match_found = True
-                                break
-                        
-                        if not match_found:
-                            print(f"Skipping {card_id} (Address '{address}' not in allowed locations)")
-                            continue
-                    
-                    # Basic price extraction (fallback)
-                    price = "N/A"
-                    for line in lines:
-                        if '€' in line and '/m²' not in line:
-                            price = line
-                            break
-                    
-                    # Size extraction
-                    size = "N/A"
-                    for line in lines:
-                        if 'm²' in line and '€/m²' not in line:
-                            size = line
-                            break
-                    
-                    # 1. Open House extraction from badges
-                    open_house = ""
-                    try:
-                        badge_elems = card.find_elements(By.CSS_SELECTOR, ".card-badges badge, .ot-card__badge, [class*='badge']")
-                        for b in badge_elems:
-                            b_text = b.text.strip()
-                            if 'Esittely' in b_text or 'Ensi-esittely' in b_text:
-                                open_house = b_text
-                                break
-                    except:
-                        pass
-
-                    # 2. Image extraction from card (using picture tag as requested)
-                    image_url = ""
-                    try:
-                        # Try to find the picture tag first
-                        picture = card.find_element(By.TAG_NAME, "picture")
-                        img_elem = picture.find_element(By.TAG_NAME, "img")
-                        image_url = img_elem.get_attribute("src")
-                    except:
-                        try:
-                            # Fallback to any img tag if picture is missing
-                            img_elem = card.find_element(By.TAG_NAME, "img")
-                            image_url = img_elem.get_attribute("src")
-                        except:
-                            pass
-
-                    # 3. Calculate Price per Sqm locally
-                    price_val = parse_to_float(price)
-                    size_val = parse_to_float(size)
-                    price_per_sqm = "N/A"
-                    if price_val > 0 and size_val > 0:
-                        calculated = price_val / size_val
-                        # Finnish friendly formatting: space for thousands, comma for decimal
-                        price_per_sqm = f"{calculated:,.2f} €/m²".replace(',', ' ').replace('.', ',')
-
-                    all_results.append({
-                        'id': card_id,
-                        'address': address,
-                        'price': price,
-                        'size': size,
-                        'url': link,
-                        'open_house': open_house,
-                        'image': image_url, 
-                        'price_per_sqm': price_per_sqm,
-                        'maintenance_fee': "N/A",
-                        'toilets': "N/A",
-                        'latitude': None,
-                        'longitude': None,
-                        'sold': False,
-                        'timestamp': time.time()
-                    })
-                except Exception as e:
-                    print(f"Error parsing card {idx} on page {page}: {e}")
-                    continue
-            
-            print(f"Added {page_listings_count} new listings from page {page}.")
-            if page_listings_count == 0:
-                print("No new listings on this page. Stopping pagination.")
-                break
-            page += 1
+        # --- PHASE 1: Collect Listings from Search Page(s) of every profile ---
+        all_results = search_profiles(profiles)
 
         # --- PHASE 2: Visit Detail Pages ---
-        print(f"\nPhase 1 Complete. Found {len(all_results)} listings total across {page-1} pages.")
-        
-        all_local = get_all_listings()
-        local_data_map = {str(item['id']): item for item in all_local}
-        
-        final_results = []
-        to_fetch_details = []
-
-        for listing in all_results:
-            lid = str(listing['id'])
-            existing = local_data_map.get(lid)
-            
-            needs_update = True
-            if existing:
-                # Compare critical info from card vs stored
-                price_match = existing.get('price') == listing['price']
-                # Relaxed open house matching: if card says "Esittely" and we have a specific date, it's a match
-                oh_match = (existing.get('open_house') == listing['open_house'])
-                if not oh_match and listing['open_house'] in ["Esittely", "Ensi-esittely"] and existing.get('open_house'):
-                    oh_match = True
-                
-                has_fee = existing.get('maintenance_fee') and existing.get('maintenance_fee') != "N/A"
-                has_coords = existing.get('latitude') is not None and existing.get('longitude') is not None
-                
-                if price_match and oh_match and has_fee and has_coords:
-                    needs_update = False
-                    # Merge existing enriched data into our results
-                    listing.update({
-                        'maintenance_fee': existing.get('maintenance_fee', "N/A"),
-                        'toilets': existing.get('toilets', "N/A"),
-                        'latitude': existing.get('latitude'),
-                        'longitude': existing.get('longitude'),
-                        'sold': existing.get('sold', False),
-                        'timestamp': existing.get('timestamp', listing['timestamp'])
-                    })
-                    # Keep high-res image if we already have it
-                    if existing.get('image') and existing['image'].startswith('http') and 'galleria' in existing['image']:
-                         listing['image'] = existing['image']
-                         
-                    print(f"Skipping details for {lid} (Up to date with fee)")
-                elif price_match and oh_match and not has_fee:
-                    print(f"Update needed for {lid} (No maintenance fee stored yet)")
-                else:
-                    print(f"Update needed for {lid} (Price or Open House changed: '{existing.get('open_house')}' -> '{listing['open_house']}')")
-            else:
-                print(f"Update needed for {lid} (New listing)")
-
-            if needs_update:
-                if existing and 'timestamp' in existing:
-                    listing['timestamp'] = existing['timestamp']
-                to_fetch_details.append(listing)
-            else:
-                final_results.append(listing)
+        final_results, to_fetch_details = plan_detail_updates(all_results)
 
         if to_fetch_details:
             print(f"Phase 2: Visiting detail pages for {len(to_fetch_details)} listings...")
-            for i, listing in enumerate(to_fetch_details):
-                print(f"[{i+1}/{len(to_fetch_details)}] Fetching details for {listing['id']}...")
-                process_detail_page(driver, listing)
-                final_results.append(listing)
+            needs_browser = to_fetch_details
+            if DETAIL_BACKEND == 'http':
+                needs_browser = enrich_over_http(to_fetch_details)
+                escalated = {id(listing) for listing in needs_browser}
+                for listing in to_fetch_details:
+                    if id(listing) not in escalated:
+                        geocode_listing(listing)
+            if needs_browser:
+                enrich_in_pool(needs_browser)
+            final_results.extend(to_fetch_details)
         else:
             print("Phase 2: All listings up to date. Skipping detail page visits.")
 
+        # Queued lookups ran alongside the detail phase; apply what has finished
+        get_geocoder().resolve(final_results)
+
         print(f"Successfully processed {len(final_results)} listings.")
+        get_driver_manager().metrics.report()
+        wait_metrics.report()
         return final_results
         
     except Exception as e:
         print(f"Selenium scraping error: {e}")
         return []
-    finally:
-        driver.quit()
 
-def process_detail_page(driver, listing):
-    """Visits the listing URL and enriches it with details."""
-    try:
-        driver.get(listing['url'])
-        time.sleep(1.5) # Slight delay to be polite and let JS render
+def search_with_selenium(url, allowed_locations):
+    """Collects card data from the search result pages by rendering them in the browser.
+
+    Pages are planned from the hit count on the first page and rendered concurrently
+    by up to SEARCH_CONCURRENCY leased browsers (never more than the pool holds).
+    """
+    manager = get_driver_manager()
+
+    def fetch_page(page):
+        current_url = page_url(url, page)
+        print(f"\n[Page {page}] Loading URL: {current_url}")
+        with manager.lease() as driver:
+            driver.get(current_url)
+            print(f"Waiting for cards on page {page}...")
+            selector = wait_for_any(driver, CARD_SELECTORS, 'oikotie_cards', fallbacks=CARD_FALLBACK_SELECTORS)
+            if not selector:
+                print(f"No cards found on page {page}.")
+                return [], None
+            page_html = driver.page_source
+            store_page('search', current_url, current_url, page_html)
+            # Extract basic info from cards on this page
+            cards = read_cards(driver, selector)
+        print(f"Found {len(cards)} cards on page {page}.")
+        return cards, parse_total_count(page_html)
+
+    cards = collect_pages(fetch_page, key=lambda card: card['href'] or id(card), url=url,
+                          workers=min(SEARCH_CONCURRENCY, manager.size)) or []
+
+    all_results = []
+    seen_ids = set()
+    for idx, card in enumerate(cards):
+        try:
+            link = card['href']
+            if not link or not any(kind in link for kind in LISTING_PATHS):
+                continue
+            card_id = link.split('/')[-1]
+            if card_id in seen_ids:
+                continue
+            seen_ids.add(card_id)
+            listing = card_to_result(card_id, card, allowed_locations)
+            if listing:
+                all_results.append(listing)
+        except Exception as e:
+            print(f"Error parsing card {idx}: {e}")
+
+    print(f"\nPhase 1 Complete. Found {len(all_results)} listings total.")
+    return all_results
+
+def card_to_result(card_id, card, allowed_locations):
+    """Turns card data from read_cards into a listing, None for ads and disallowed locations."""
+    link = card['href']
+    lines = card['lines']
+    # Skip promotional labels like "Plus" or "Uusi" if they are at the top
+    address = "Unknown Address"
+    skip_labels = ["Plus", "Uusi", "Uutuus", "Nostettu", "Samankaltaisia asuntoja lähialueilta"]
+    for line in lines:
+        if line not in skip_labels:
+            address = line
+            break
+    
+    if "Samankaltaisia" in address:
+        return None
         
-        # Check for sold/removed status
+    # Filter by allowed locations (if configured)
+    # This prevents picking up "Nearby" or generic ad listings
+    if not is_allowed(address, allowed_locations):
+        print(f"Skipping {card_id} (Address '{address}' not in allowed locations)")
+        return None
+    
+    # Basic price extraction (fallback)
+    price = "N/A"
+    for line in lines:
+        if '€' in line and '/m²' not in line:
+            price = line
+            break
+    
+    # Size extraction
+    size = "N/A"
+    for line in lines:
+        if 'm²' in line and '€/m²' not in line:
+            size = line
+            break
+    
+    # 1. Open House extraction from badges
+    open_house = ""
+    for b_text in card['badges']:
+        if 'Esittely' in b_text or 'Ensi-esittely' in b_text:
+            open_house = b_text
+            break
+
+    # 2. Image from the card's picture tag (or any img)
+    image_url = card['image']
+
+    # 3. Calculate Price per Sqm locally
+    price_cents = parse_cents(price)
+    size_val = parse_number(size)
+    price_per_sqm = "N/A"
+    if price_cents and size_val:
+        price_per_sqm = format_price_per_sqm(round(price_cents / size_val))
+
+    return {
+        'id': card_id,
+        'address': address,
+        'price': price,
+        'size': size,
+        'url': link,
+        'open_house': open_house,
+        'image': image_url, 
+        'price_per_sqm': price_per_sqm,
+        'maintenance_fee': "N/A",
+        'toilets': "N/A",
+        'latitude': None,
+        'longitude': None,
+        'sold': False,
+        'timestamp': time.time()
+    }
+
+def read_cards(driver, selector, mode=None):
+    """Reads every card matching `selector` as {'href', 'lines', 'badges', 'image'}.
+
+    The 'script' mode collects all cards in a single execute_script call; 'elements'
+    queries each card element by element (several chromedriver round trips per card).
+    """
+    if (mode or CARD_EXTRACTION) == 'script':
+        return driver.execute_script(_READ_CARDS_JS, selector, BADGE_SELECTOR) or []
+    return [_read_card_elements(card) for card in driver.find_elements(By.CSS_SELECTOR, selector)]
+
+def _read_card_elements(card):
+    href_elems = card.find_elements(By.TAG_NAME, "a")
+    link = href_elems[0].get_attribute("href") if href_elems else ""
+    lines = [line.strip() for line in card.text.split('\n') if line.strip()]
+
+    badges = []
+    try:
+        badges = [b.text.strip() for b in card.find_elements(By.CSS_SELECTOR, BADGE_SELECTOR)]
+    except:
+        pass
+
+    image_url = ""
+    try:
+        # Try to find the picture tag first
+        picture = card.find_element(By.TAG_NAME, "picture")
+        img_elem = picture.find_element(By.TAG_NAME, "img")
+        image_url = img_elem.get_attribute("src")
+    except:
         try:
-            page_text_lower = driver.find_element(By.TAG_NAME, "body").text.lower()
-            if "kohde on poistunut" in page_text_lower or "myyty" in page_text_lower:
-                listing['sold'] = True
-                listing['open_house'] = "" # Clear open house if sold
+            # Fallback to any img tag if picture is missing
+            img_elem = card.find_element(By.TAG_NAME, "img")
+            image_url = img_elem.get_attribute("src")
         except:
             pass
+    return {'href': link or "", 'lines': lines, 'badges': badges, 'image': image_url or ""}
 
-        # 1. Extract High-Res Image from Galleria
-        try:
-            # Look for galleria stage
-            stage = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "galleria-stage"))
-            )
-            img = stage.find_element(By.TAG_NAME, "img")
-            src = img.get_attribute("src")
-            if src:
-                listing['image'] = src
-        except:
-            # Fallback on detail page: try generic large image or og:image
-            try:
-                og_img = driver.find_element(By.CSS_SELECTOR, "meta[property='og:image']")
-                if og_img:
-                        listing['image'] = og_img.get_attribute("content")
-            except:
-                pass
+def plan_detail_updates(all_results):
+    """Splits search results into (up to date, needing a detail page visit), merging stored details into the former."""
+    all_local = get_all_listings()
+    local_data_map = {str(item['id']): item for item in all_local}
+    
+    final_results = []
+    to_fetch_details = []
+
+    for listing in all_results:
+        lid = str(listing['id'])
+        existing = local_data_map.get(lid)
         
-        # 2. Extract Details from Definition Lists (dl > dt, dd)
-        try:
-            dt_elems = driver.find_elements(By.TAG_NAME, "dt")
-            for dt in dt_elems:
-                try:
-                    key = dt.get_attribute("textContent").strip().lower()
-                    dd = dt.find_element(By.XPATH, "following-sibling::dd")
-                    value = dd.get_attribute("textContent").strip()
-                    
-                    if "neliöhinta" in key:
-                        listing['price_per_sqm'] = value
-                    elif "hoitovastike" in key:
-                        listing['maintenance_fee'] = value
-                    elif "huoneiston kokoonpano" in key:
-                        # Extract toilet info from the composition string
-                        toilet_info = extract_toilet_from_text(value)
-                        if toilet_info:
-                            listing['toilets'] = toilet_info
-                except:
-                    continue
-        except Exception as detail_err:
-                print(f"Error extracting details table: {detail_err}")
-
-        # 2.5 Extract from main description if not found yet
-        if not listing.get('toilets') or listing['toilets'] == "N/A":
-            try:
-                desc_elem = driver.find_element(By.CSS_SELECTOR, ".paragraph--keep-formatting")
-                if desc_elem:
-                    toilet_info = extract_toilet_from_text(desc_elem.text)
-                    if toilet_info:
-                        listing['toilets'] = toilet_info
-            except:
-                pass
-
-        # 3. Extract Open House Info from Detail Page
+        needs_update = True
+        if existing:
+            # Compare critical info from card vs stored
+            price_match = existing.get('price') == listing['price']
+            # Relaxed open house matching: if card says "Esittely" and we have a specific date, it's a match
+            oh_match = (existing.get('open_house') == listing['open_house'])
+            if not oh_match and listing['open_house'] in ["Esittely", "Ensi-esittely"] and existing.get('open_house'):
+                oh_match = True
+            
+            has_fee = existing.get('maintenance_fee') and existing.get('maintenance_fee') != "N/A"
+            has_coords = existing.get('latitude') is not None and existing.get('longitude') is not None
+            
+            if price_match and oh_match and has_fee and has_coords:
+                needs_update = False
+                # Merge existing enriched data into our results
+                listing.update({
+                    'maintenance_fee': existing.get('maintenance_fee', "N/A"),
+                    'toilets': existing.get('toilets', "N/A"),
+                    'latitude': existing.get('latitude'),
+                    'longitude': existing.get('longitude'),
+                    'sold': existing.get('sold', False),
+                    'timestamp': existing.get('timestamp', listing['timestamp'])
+                })
+                if existing.get('geocode_precision'):
+                    listing['geocode_precision'] = existing['geocode_precision']
+                # A district/city centroid is only a placeholder: queue the street level lookup now
+                get_geocoder().locate(listing)
+                # Keep high-res image if we already have it
+                if existing.get('image') and existing['image'].startswith('http') and 'galleria' in existing['image']:
+                     listing['image'] = existing['image']
+                     
+                print(f"Skipping details for {lid} (Up to date with fee)")
+            elif price_match and oh_match and not has_fee:
+                print(f"Update needed for {lid} (No maintenance fee stored yet)")
+            else:
+                print(f"Update needed for {lid} (Price or Open House changed: '{existing.get('open_house')}' -> '{listing['open_house']}')")
+        else:
+            print(f"Update needed for {lid} (New listing)")
+
+        if needs_update:
+            if existing and 'timestamp' in existing:
+                listing['timestamp'] = existing['timestamp']
+            to_fetch_details.append(listing)
+        else:
+            final_results.append(listing)
+
+    return final_results, to_fetch_details
+
+
+def enrich_in_pool(listings, workers=None, rate=None, label="Fetching details for"):
+    """Runs process_detail_page over `listings` with a pool of browser workers.
+
+    Workers lease warm browsers from the driver manager, pull from a shared queue and
+    space their page loads by the site's process-wide detail rate limit, so adding workers
+    (or running detail and verification visits at once) overlaps rendering without hitting
+    the site harder. An explicit `rate` gets a limiter of its own. Returns the listings in
+    input order and a timing summary.
+    """
+    workers = max(1, min(workers or DETAIL_WORKERS, len(listings)))
+    if rate is None and listings:
+        limiter = host_limiter('detail', listings[0]['url'], DETAIL_RATE_LIMIT)
+    else:
+        limiter = RateLimiter(DETAIL_RATE_LIMIT if rate is None else rate)
+    jobs = queue.Queue()
+    for item in enumerate(listings):
+        jobs.put(item)
+    durations = [0.0] * len(listings)
+    manager = get_driver_manager()
+
+    def work():
         try:
-            scripts = driver.find_elements(By.CSS_SELECTOR, "script[type='application/ld+json']")
-            oh_info = []
-            for script in scripts:
-                try:
-                    inner_html = script.get_attribute('innerHTML')
-                    data = json.loads(inner_html)
-                    items = data if isinstance(data, list) else [data]
-                    for item in items:
-                        if isinstance(item, dict) and item.get('@type') == 'Event':
-                            name = item.get('name', '')
-                            start = item.get('startDate', '')
-                            if start:
-                                try:
-                                    dt_obj = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                                    oh_info.append(f"{dt_obj.strftime('%d.%m. klo %H:%M')}")
-                                except:
-                                    if name: oh_info.append(name)
-                    if oh_info:
-                        listing['open_house'] = ", ".join(oh_info)
-                        break
-                except:
-                    continue
-
-            if not listing.get('open_house'):
-                viewing_elements = driver.find_elements(By.CSS_SELECTOR, "ul.public-viewings li.public-viewings__item")
-                if viewing_elements:
-                    viewings = []
-                    for ve in viewing_elements:
-                        try:
-                            date_text = ve.find_element(By.TAG_NAME, "b").text.strip()
-                            time_info = ve.find_element(By.CLASS_NAME, "public-viewings__item-content").text.strip()
-                            viewings.append(f"{date_text} {time_info}")
-                        except:
-                            continue
-                    if viewings:
-                        listing['open_house'] = " | ".join(viewings)
-        except Exception as oh_err:
-            print(f"Error extracting open house info: {oh_err}")
-
-        # 4. Geocode Address if not found in page
-        if not listing.get('latitude') or not listing.get('longitude'):
-            try:
-                addr = listing['address']
-                if '●' in addr:
-                    addr = addr.split('●')[0].strip()
-                
-                location = geolocator.geocode(addr, country_codes='fi', timeout=10)
-                if location:
-                    listing['latitude'] = location.latitude
-                    listing['longitude'] = location.longitude
-                else:
-                    if ',' in addr:
-                        parts = addr.split(',')
-                        city = parts[-1].strip()
-                        street = parts[0].strip()
-                        location = geolocator.geocode(f"{street}, {city}", country_codes='fi', timeout=10)
-                        if location:
-                            listing['latitude'] = location.latitude
-                            listing['longitude'] = location.longitude
-            except (GeocoderTimedOut, Exception) as geo_err:
-                print(f"Geocoding error for {listing['address']}: {geo_err}")
+            with manager.lease() as driver:
+                while True:
+                    try:
+                        i, listing = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    limiter.wait()
+                    print(f"[{i+1}/{len(listings)}] {label} {listing['id']}...")
+                    page_start = time.perf_counter()
+                    process_detail_page(driver, listing)
+                    durations[i] = time.perf_counter() - page_start
+        except Exception as e:
+            # Listings this worker did not reach stay in the queue for the others
+            print(f"Detail worker error: {e}")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    sequential = sum(durations)
+    summary = {
+        'pages': len(listings),
+        'workers': workers,
+        'elapsed': elapsed,
+        'sequential_estimate': sequential,
+        'speedup': sequential / elapsed if elapsed else 1.0,
+    }
+    print(f"Detail pages: {len(listings)} with {workers} workers in {elapsed:.1f}s "
+          f"(one worker would take ~{sequential:.1f}s, {summary['speedup']:.1f}x)")
+    return listings, summary
+
+def process_detail_page(driver, listing):
+    """Visits the listing URL and enriches it with details."""
+    try:
+        driver.get(listing['url'])
+        # Let client-side rendering finish; politeness is handled by the pool's rate limit
+        wait_until_settled(driver, 'detail_page')
+
+        # One round trip for the rendered page; the fields are read by the same parser the HTTP backend uses
+        page_html = driver.page_source
+        store_page('detail', listing['id'], listing['url'], page_html)
+        apply_details(listing, parse_detail_page(page_html))
+
+        # Geocode Address if not found in page
+        geocode_listing(listing)
 
     except Exception as e:
         print(f"Failed to load details for {listing['id']}: {e}")
 
+def geocode_listing(listing):
+    """Fills latitude/longitude from the geocode cache (or a district centroid) and queues a lookup for unknown addresses."""
+    get_geocoder().locate(listing)
+
 def verify_listings(listings):
-    """Verifies the status of specific listings by visiting their URLs."""
+    """Verifies the status of specific listings.
+
+    All of them are checked concurrently over HTTP first; only the ones that give no
+    clear answer are opened in the browser. Listings confirmed active within the last
+    STATUS_RECHECK_HOURS are skipped. Returns the listings that were checked.
+    """
     if not listings:
         return []
-        
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-    driver = webdriver.Chrome(options=options)
-    print(f"Verifying {len(listings)} listings...")
-    
-    try:
-        for i, listing in enumerate(listings):
-            print(f"[{i+1}/{len(listings)}] Verifying {listing['id']}...")
-            process_detail_page(driver, listing)
-            # listing['timestamp'] = time.time()  # Removed to preserve original age
-            
-    except Exception as e:
-        print(f"Verification error: {e}")
-    finally:
-        driver.quit()
-        
-    return listings
 
-def extract_toilet_from_text(text):
-    """Helper to extract toilet information from a Finnish text string."""
-    if not text:
-        return None
-    
-    text_lower = text.lower()
-    
-    # Check for "erillinen wc" (separate toilet)
-    has_separate = "erillinen wc" in text_lower or "erill. wc" in text_lower
-    
-    # Check for multiple toilets
-    # Patterns like "2 wc", "kaksi wc:tä", "3 x wc"
-    import re
-    multi_patterns = [
-        r'(\d+)\s*(?:x|kpl)?\s*wc',
-        r'(kaksi|kolme|neljä)\s*wc:tä',
-        r'wc:itä\s*(\d+)',
-    ]
-    
-    found_count = None
-    for pattern in multi_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            found_count = match.group(1)
-            # Convert text numbers to digits
-            num_map = {"kaksi": "2", "kolme": "3", "neljä": "4"}
-            found_count = num_map.get(found_count, found_count)
-            break
-            
-    # If no explicit count like "2 wc", but "wc" mentioned multiple times
-    if not found_count:
-        wc_count = text_lower.count('wc')
-        if wc_count >= 2:
-            found_count = str(wc_count)
-
-    if has_separate and found_count and int(found_count) > 1:
-        return f"{found_count} WC (sis. erillinen WC)"
-    elif has_separate:
-        return "Erillinen WC"
-    elif found_count:
-        return f"{found_count} WC"
-        
-    return None
+    status_cache = StatusCache()
+    pending = [l for l in listings if not status_cache.is_fresh(l['id'])]
+    if len(pending) < len(listings):
+        print(f"Skipping {len(listings) - len(pending)} listings verified as active in the last {STATUS_RECHECK_HOURS:g}h.")
+    if not pending:
+        return []
+
+    print(f"Verifying {len(pending)} listings...")
+    # Timestamps are left alone to preserve the original age
+    ambiguous = check_status_over_http(pending)
+    if ambiguous:
+        enrich_in_pool(ambiguous, label="Verifying")
+    for listing in pending:
+        status_cache.record(listing)
+    try:
+        status_cache.save()
+    except OSError as e:
+        print(f"Could not save status checks: {e}")
+    get_geocoder().resolve(pending)
+    return pending
 
 if __name__ == "__main__":
     listings = fetch_with_selenium()
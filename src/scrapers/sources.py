@@ -0,0 +1,294 @@
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.geocoding import CITY_CENTROIDS, COARSE_PRECISIONS, DISTRICT_CENTROIDS
+from src.utils.listing import parse_cents, parse_number
+
+# Sources that run on /refresh, in priority order: when the same apartment is listed on
+# several portals, the first source's listing is kept and the others are linked to it.
+ENABLED_SOURCES = [s.strip() for s in os.getenv('SOURCES', 'oikotie').lower().split(',') if s.strip()]
+
+_CENTROIDS = set(DISTRICT_CENTROIDS.values()) | set(CITY_CENTROIDS.values())
+
+DUPLICATE_SIZE_TOLERANCE = 0.5   # m²
+DUPLICATE_DISTANCE_METERS = 40   # precise coordinates closer than this count as the same building
+DUPLICATE_PRICE_TOLERANCE = 0.02  # relative asking price difference, when both prices are known
+
+
+class Source:
+    """A listing portal. Subclasses set `name` and implement `fetch()`.
+
+    `fetch()` returns listing dicts in the shared shape (see scraper_selenium). `verify()`
+    receives stored listings of this source that the latest fetch did not return and
+    returns the ones it updated; the default leaves them untouched.
+    """
+    name = None
+
+    def fetch(self):
+        raise NotImplementedError
+
+    def verify(self, listings):
+        return []
+
+
+_registry = {}
+
+def register_source(cls):
+    """Class decorator that makes a source available under its `name`."""
+    _registry[cls.name] = cls
+    return cls
+
+def get_sources(names=None):
+    """Instances of the enabled sources (SOURCES env, comma separated) in priority order."""
+    sources = []
+    for name in names or ENABLED_SOURCES:
+        if name not in _registry:
+            print(f"Unknown source '{name}' (available: {', '.join(sorted(_registry))})")
+            continue
+        sources.append(_registry[name]())
+    return sources
+
+
+@register_source
+class OikotieSource(Source):
+    name = 'oikotie'
+
+    def fetch(self):
+        from src.scrapers.scraper_selenium import fetch_with_selenium
+        return fetch_with_selenium()
+
+    def verify(self, listings):
+        from src.scrapers.scraper_selenium import verify_listings
+        return verify_listings(listings)
+
+
+@register_source
+class EtuoviSource(Source):
+    name = 'etuovi'
+
+    def fetch(self):
+        from src.scrapers.scraper_etuovi import fetch_from_etuovi
+        return fetch_from_etuovi()
+
+
+def _address_key(address):
+    """'Kettutie 5 B 12, Herttoniemi, Helsinki' -> ('kettutie 5', ('b', '12')).
+
+    The first part is the building (street and house number), the second the staircase
+    and apartment number, empty when the address does not give them.
+    """
+    street = (address or '').split('●')[0].split(',')[0].lower()
+    street = re.sub(r'\s+', ' ', street).strip()
+    match = re.match(r'^(\D+?\s*\d+(?:\s*-\s*\d+)?)(.*)$', street)
+    if not match:
+        return street, ()
+    unit = re.sub(r'\bas\b\.?', ' ', match.group(2))
+    building = re.sub(r'\s*-\s*', '-', match.group(1))
+    return building, tuple(re.findall(r'[a-zäöå]+|\d+', unit))
+
+
+def _same_unit(a, b):
+    """False only when both units are given and differ ('a' matches 'a 3', 'a 3' does not match 'b 12')."""
+    shorter, longer = sorted((a, b), key=len)
+    return longer[:len(shorter)] == shorter
+
+
+def _distance_m(a, b):
+    lat = math.radians((a[0] + b[0]) / 2)
+    dy = (a[0] - b[0]) * 111320
+    dx = (a[1] - b[1]) * 111320 * math.cos(lat)
+    return math.hypot(dx, dy)
+
+
+class DuplicateIndex:
+    """Finds the same apartment listed on different portals.
+
+    Two listings match when their sizes (and prices, if both are known) agree and either
+    their buildings (street and house number) are equal or their street level coordinates
+    are within DUPLICATE_DISTANCE_METERS of each other. Units in one building often share
+    a floor plan and price, so when both addresses give a staircase and apartment number
+    those must agree as well. Listings already linked to the source being matched are
+    skipped: a portal does not list an apartment twice.
+    """
+
+    def __init__(self):
+        self._by_street = {}
+        self._by_cell = {}
+
+    @staticmethod
+    def _coords(listing):
+        lat, lon = listing.get('latitude'), listing.get('longitude')
+        if not lat or not lon or listing.get('geocode_precision') in COARSE_PRECISIONS:
+            return None
+        # Records saved without their precision can still sit on a district or city centre
+        if (lat, lon) in _CENTROIDS:
+            return None
+        return lat, lon
+
+    @staticmethod
+    def _cell(coords):
+        return round(coords[0], 3), round(coords[1], 3)
+
+    def add(self, listing):
+        building, _ = _address_key(listing.get('address'))
+        self._by_street.setdefault(building, []).append(listing)
+        coords = self._coords(listing)
+        if coords:
+            self._by_cell.setdefault(self._cell(coords), []).append(listing)
+
+    def remove(self, listing):
+        for bucket in list(self._by_street.values()) + list(self._by_cell.values()):
+            if any(other is listing for other in bucket):
+                bucket[:] = [other for other in bucket if other is not listing]
+
+    def find(self, listing, source_name):
+        """The indexed listing from another source that is the same apartment, None if there is none."""
+        size = parse_number(listing.get('size'))
+        if not size:
+            return None
+        price = parse_cents(listing.get('price'))
+        building, unit = _address_key(listing.get('address'))
+        def matches(other):
+            if source_name in other.get('sources', {}):
+                return False
+            if not _same_unit(unit, _address_key(other.get('address'))[1]):
+                return False
+            other_size = parse_number(other.get('size'))
+            if other_size is None or abs(other_size - size) > DUPLICATE_SIZE_TOLERANCE:
+                return False
+            other_price = parse_cents(other.get('price'))
+            return not (price and other_price) or abs(other_price - price) <= DUPLICATE_PRICE_TOLERANCE * price
+
+        for other in self._by_street.get(building, []):
+            if matches(other):
+                return other
+        coords = self._coords(listing)
+        if coords:
+            lat_cell, lon_cell = self._cell(coords)
+            for dlat in (-0.001, 0, 0.001):
+                for dlon in (-0.001, 0, 0.001):
+                    for other in self._by_cell.get((round(lat_cell + dlat, 3), round(lon_cell + dlon, 3)), []):
+                        if matches(other) and _distance_m(coords, self._coords(other)) <= DUPLICATE_DISTANCE_METERS:
+                            return other
+        return None
+
+
+def _superseded(listing, kept):
+    """A stored record soft-removed in favour of the listing kept for the same apartment."""
+    listing = dict(listing)
+    listing['removed'] = True
+    listing['duplicate_of'] = str(kept['id'])
+    return listing
+
+
+def merge_sources(results, stored=()):
+    """Merges [(source, listings)] in priority order into one list without cross-site duplicates.
+
+    A duplicate is dropped in favour of the higher priority listing, which records the
+    URL of every portal it was found on in `sources` ({source name: url}).
+
+    `stored` are the listings already saved. Active ones the sources did not return
+    again take part in matching, so an apartment stored from one portal in an earlier
+    run is linked when another portal lists it later: a stored record of a higher
+    priority source gets the new URL (and is returned to be saved with it), otherwise
+    the new listing is kept. Stored records that lose to another listing, including
+    the stored copies of dropped duplicates, are returned soft-removed
+    (removed=True, duplicate_of=<kept id>) so the apartment is shown once.
+    """
+    priority = {source.name: i for i, (source, _) in enumerate(results)}
+    def rank(listing):
+        return priority.get(listing.get('source', 'oikotie'), len(priority))
+
+    stored_active = {str(l['id']): l for l in stored if not l.get('sold') and not l.get('removed')}
+    fetched_ids = {str(l['id']) for _, listings in results for l in listings}
+    index = DuplicateIndex()
+    seeds = {}
+    for lid, listing in stored_active.items():
+        if lid not in fetched_ids:
+            listing = dict(listing)
+            listing['sources'] = dict(listing.get('sources') or {listing.get('source', 'oikotie'): listing.get('url')})
+            seeds[lid] = listing
+            index.add(listing)
+
+    merged = []
+    linked = {}      # stored records that gained a link this run
+    superseded = {}  # stored records replaced by another listing
+    duplicates = 0
+    for source, listings in results:
+        for listing in listings:
+            lid = str(listing['id'])
+            listing.setdefault('source', source.name)
+            original = index.find(listing, source.name)
+            if original is not None and str(original['id']) in seeds and rank(original) > rank(listing):
+                # An earlier run stored this apartment from a lower priority portal
+                index.remove(original)
+                seed_id = str(original['id'])
+                linked.pop(seed_id, None)
+                superseded[seed_id] = _superseded(original, listing)
+                listing['sources'] = {source.name: listing.get('url'), **original['sources']}
+                index.add(listing)
+                merged.append(listing)
+                duplicates += 1
+                continue
+            if original is not None:
+                original['sources'][source.name] = listing.get('url')
+                if str(original['id']) in seeds:
+                    linked[str(original['id'])] = original
+                if lid in stored_active and lid != str(original['id']):
+                    superseded[lid] = _superseded(stored_active[lid], original)
+                duplicates += 1
+                continue
+            listing['sources'] = {source.name: listing.get('url')}
+            index.add(listing)
+            merged.append(listing)
+    if duplicates:
+        print(f"Linked {duplicates} listings that appear on more than one portal.")
+    if superseded:
+        print(f"Hid {len(superseded)} stored listings now linked to a listing on another portal.")
+    return merged + list(linked.values()) + list(superseded.values())
+
+
+def fetch_all_sources(sources=None, stored=None):
+    """Fetches all enabled sources concurrently and merges them with the stored listings.
+
+    Returns (listings to save, every ID fetched including linked duplicates, names of the
+    sources that returned anything). Listings of a source that came back empty are not
+    treated as gone.
+    """
+    if stored is None:
+        from src.utils.storage import get_all_listings
+        stored = get_all_listings()
+    sources = sources or get_sources()
+    if not sources:
+        return [], set(), set()
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        fetched = list(pool.map(_fetch_source, sources))
+    for source, listings in zip(sources, fetched):
+        print(f"Source '{source.name}': {len(listings)} listings")
+    succeeded = {source.name for source, listings in zip(sources, fetched) if listings}
+    found_ids = {listing['id'] for listings in fetched for listing in listings}
+    return merge_sources(list(zip(sources, fetched)), stored), found_ids, succeeded
+
+
+def _fetch_source(source):
+    try:
+        return source.fetch() or []
+    except Exception as e:
+        print(f"Source '{source.name}' failed: {e}")
+        return []
+
+
+def verify_missing(missing, succeeded, sources=None):
+    """Hands listings missing from the latest fetch to their own source for verification.
+
+    Only sources in `succeeded` verify; for the others an empty fetch says nothing.
+    """
+    by_name = {source.name: source for source in (sources or get_sources())}
+    verified = []
+    for name in sorted(succeeded):
+        group = [l for l in missing if l.get('source', 'oikotie') == name]
+        if group and name in by_name:
+            print(f"Found {len(group)} missing '{name}' items. Verifying status...")
+            verified.extend(by_name[name].verify(group))
+    return verified
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlsplit
+import aiohttp
+from src.scrapers.detail_http import DETAIL_CONCURRENCY, DETAIL_HOST_BURST, DETAIL_HOST_RATE
+from src.scrapers.detail_parser import apply_details, has_details, parse_detail_page
+from src.scrapers.scraper_http import HEADERS
+from src.utils.page_archive import store_page
+from src.utils.rate_limit import AsyncTokenBucket
+
+STATUS_CACHE_PATH = os.path.join('data', 'status_checks.json')
+STATUS_RECHECK_HOURS = float(os.getenv('STATUS_RECHECK_HOURS', '12'))  # listings confirmed active are not checked again sooner
+
+# Responses that mean the listing page no longer exists
+GONE_STATUSES = (404, 410)
+
+
+def classify_response(listing, status, final_url, page_html):
+    """Decides what a status check response says about a listing.
+
+    Returns ('sold', fields), ('active', fields) or ('ambiguous', None). Ambiguous
+    covers everything a browser should look at: errors, rate limiting, consent or
+    bot walls and pages without the detail fields.
+    """
+    if status in GONE_STATUSES:
+        return 'sold', {'sold': True, 'open_house': ""}
+    if status != 200 or not page_html:
+        return 'ambiguous', None
+    # Removed listings redirect to a search page that no longer mentions the ID
+    lid = str(listing['id'])
+    if lid in urlsplit(listing['url']).path and lid not in urlsplit(final_url).path:
+        return 'sold', {'sold': True, 'open_house': ""}
+    try:
+        fields = parse_detail_page(page_html)
+    except Exception as e:
+        print(f"Error parsing status page for {listing['id']}: {e}")
+        return 'ambiguous', None
+    if fields.get('sold'):
+        return 'sold', fields
+    if has_details(fields):
+        return 'active', fields
+    return 'ambiguous', None
+
+
+async def _check(session, semaphore, buckets, listing):
+    url = listing['url']
+    bucket = buckets.setdefault(urlsplit(url).netloc, AsyncTokenBucket(DETAIL_HOST_RATE, DETAIL_HOST_BURST))
+    async with semaphore:
+        await bucket.acquire()
+        try:
+            async with session.get(url) as response:
+                page_html = await response.text() if response.status == 200 else None
+                return response.status, str(response.url), page_html
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"HTTP error for {url}: {e}")
+            return None, url, None
+
+
+async def _check_all(listings):
+    semaphore = asyncio.Semaphore(DETAIL_CONCURRENCY)
+    buckets = {}
+    timeout = aiohttp.ClientTimeout(total=20)
+    connector = aiohttp.TCPConnector(limit=DETAIL_CONCURRENCY)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+        return await asyncio.gather(*(_check(session, semaphore, buckets, listing) for listing in listings))
+
+
+def check_status_over_http(listings):
+    """Checks whether `listings` are still for sale with concurrent HTTP requests.
+
+    Sold/removed and active listings are updated in place (the same fields a browser
+    visit sets). Returns the ambiguous ones, which still need a browser.
+    """
+    if not listings:
+        return []
+    start = time.perf_counter()
+    responses = asyncio.run(_check_all(listings))
+    ambiguous = []
+    counts = {'sold': 0, 'active': 0, 'ambiguous': 0}
+    for listing, (status, final_url, page_html) in zip(listings, responses):
+        if page_html:
+            store_page('detail', listing['id'], final_url, page_html)
+        verdict, fields = classify_response(listing, status, final_url, page_html)
+        counts[verdict] += 1
+        if verdict == 'ambiguous':
+            ambiguous.append(listing)
+        else:
+            apply_details(listing, fields)
+    print(f"HTTP status checks: {counts['sold']} sold/removed, {counts['active']} active, "
+          f"{counts['ambiguous']} left for the browser ({time.perf_counter() - start:.1f}s)")
+    return ambiguous
+
+
+class StatusCache:
+    """When each listing was last verified and what the answer was, in data/status_checks.json."""
+
+    def __init__(self, path=STATUS_CACHE_PATH, recheck_hours=STATUS_RECHECK_HOURS):
+        self.path = path
+        self.recheck_seconds = recheck_hours * 60 * 60
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_fresh(self, lid):
+        """True if the listing was confirmed active recently enough to skip checking it again."""
+        entry = self.entries.get(str(lid))
+        return bool(entry and entry['status'] == 'active'
+                    and time.time() - entry['checked_at'] < self.recheck_seconds)
+
+    def record(self, listing):
+        self.entries[str(listing['id'])] = {'status': 'sold' if listing.get('sold') else 'active',
+                                            'checked_at': time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
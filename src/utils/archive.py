@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+ARCHIVE_DIR = os.path.join('data', 'archive')
+ARCHIVE_INDEX_PATH = os.path.join(ARCHIVE_DIR, 'index.json')
+
+# Sold/removed listings whose last activity is older than this are moved to the archive
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+_index_lock = threading.Lock()
+_index = {'mtime': None, 'entries': {}}  # lid -> {'segment': name, 'archived_at': ts}
+
+
+def _segment_path(name):
+    return os.path.join(ARCHIVE_DIR, name)
+
+
+def load_index():
+    """Returns {listing_id: {'segment', 'archived_at'}} for every archived listing."""
+    with _index_lock:
+        try:
+            mtime = os.stat(ARCHIVE_INDEX_PATH).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != _index['mtime']:
+            with open(ARCHIVE_INDEX_PATH, 'r') as f:
+                _index['entries'] = json.load(f)
+            _index['mtime'] = mtime
+        return _index['entries']
+
+
+def _save_index(entries):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = ARCHIVE_INDEX_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, ARCHIVE_INDEX_PATH)
+
+
+def _last_activity(listing, history):
+    """Timestamp of the last history point, falling back to the listing's own timestamp."""
+    if history and history[-1].get('timestamp'):
+        try:
+            return datetime.fromisoformat(history[-1]['timestamp']).timestamp()
+        except ValueError:
+            pass
+    return listing.get('timestamp') or 0
+
+
+def is_archivable(listing, history, now=None, max_age_days=ARCHIVE_AFTER_DAYS):
+    if not (listing.get('sold') or listing.get('removed')):
+        return False
+    now = now or time.time()
+    return now - _last_activity(listing, history) > max_age_days * 24 * 60 * 60
+
+
+def archive_listings(items):
+    """Appends [(listing, history)] to gzip segments per month of last activity and indexes them.
+
+    Segments are multi-member gzip files, so later runs append without rewriting.
+    """
+    if not items:
+        return 0
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    by_segment = {}
+    for listing, history in items:
+        month = datetime.fromtimestamp(_last_activity(listing, history)).strftime('%Y-%m')
+        by_segment.setdefault(f"{month}.jsonl.gz", []).append((listing, history))
+
+    entries = dict(load_index())
+    archived_at = time.time()
+    for name, segment_items in by_segment.items():
+        with gzip.open(_segment_path(name), 'at', encoding='utf-8') as f:
+            for listing, history in segment_items:
+                f.write(json.dumps({'listing': listing, 'history': history}, ensure_ascii=False) + '\n')
+                entries[str(listing['id'])] = {'segment': name, 'archived_at': archived_at}
+    _save_index(entries)
+    return len(items)
+
+
+def _iter_segment(name):
+    with gzip.open(_segment_path(name), 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_archived(lid):
+    """Returns (listing, history) for an archived listing, or (None, []) if it is not archived."""
+    meta = load_index().get(str(lid))
+    if not meta:
+        return None, []
+    found = (None, [])
+    # A listing archived twice (re-listed, then sold again) keeps its latest record
+    for record in _iter_segment(meta['segment']):
+        if str(record['listing']['id']) == str(lid):
+            found = (record['listing'], record['history'])
+    return found
+
+
+def iter_archived():
+    """Yields (listing, history) for every archived listing, reading each segment once."""
+    entries = load_index()
+    for name in sorted({meta['segment'] for meta in entries.values()}):
+        latest = {}
+        for record in _iter_segment(name):
+            lid = str(record['listing']['id'])
+            if entries.get(lid, {}).get('segment') == name:
+                latest[lid] = record
+        for record in latest.values():
+            yield record['listing'], record['history']
@@ -0,0 +1,243 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+SEGMENT_PREFIX = 'price_changes-'
+SEGMENT_SUFFIX = '.jsonl'
+COMPRESSED_SUFFIX = '.jsonl.gz'
+
+
+def fsync_dir(directory):
+    """Flushes a directory entry (new or renamed files) to disk; a no-op where directories cannot be opened."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def normalize_time(value):
+    """Accepts an ISO string, datetime or epoch seconds and returns a comparable ISO string."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return datetime.fromtimestamp(value).isoformat()
+
+
+class ChangeLog:
+    """Append-only, line-delimited price change log split into monthly segments.
+
+    Each segment holds one JSON object per line. A small index keeps the entry count per
+    segment so readers can seek by offset or month without scanning earlier segments.
+    It also records each segment's size in bytes: a segment whose size no longer matches
+    (an append that crashed before the index was saved) is counted again on load.
+    """
+
+    def __init__(self, directory, legacy_path=None):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        os.makedirs(directory, exist_ok=True)
+        self._index = None      # segment name -> entry count
+        self._sizes = {}        # segment name -> size in bytes when it was counted
+        self._compressing = {}  # plain segment name -> expected archive size, while compress() runs
+        self._index_mtime = None
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _segment_name(self, timestamp):
+        # Entries are rotated into a new segment every calendar month ('2024-01-18T...' -> '2024-01')
+        month = (timestamp or datetime.now().isoformat())[:7]
+        return f"{SEGMENT_PREFIX}{month}{SEGMENT_SUFFIX}"
+
+    def _segment_month(self, name):
+        return name[len(SEGMENT_PREFIX):len(SEGMENT_PREFIX) + 7]
+
+    def segments(self):
+        """Returns segment file names (plain and compressed) in chronological order."""
+        return sorted(f for f in os.listdir(self.directory)
+                      if f.startswith(SEGMENT_PREFIX) and f.endswith((SEGMENT_SUFFIX, COMPRESSED_SUFFIX)))
+
+    def _open(self, name, mode='r'):
+        path = os.path.join(self.directory, name)
+        if name.endswith(COMPRESSED_SUFFIX):
+            return gzip.open(path, mode + 't', encoding='utf-8')
+        return open(path, mode)
+
+    def _index_stamp(self):
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _segment_size(self, name):
+        try:
+            return os.path.getsize(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            return None
+
+    def _load_index(self):
+        # Reload when another process has appended since we last looked
+        if self._index is None or self._index_stamp() != self._index_mtime:
+            stored = {}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, 'r') as f:
+                        stored = json.load(f)
+                except Exception as e:
+                    print(f"Error reading change log index, rebuilding: {e}")
+            if 'segments' not in stored:
+                # Older indexes held bare counts without sizes; every segment is counted once
+                stored = {'segments': {}}
+            index, sizes = {}, {}
+            # Segments missing from the index or changed since it was saved (e.g. after a crash) are counted again
+            for name in self.segments():
+                count, size = stored['segments'].get(name, (None, None))
+                actual = self._segment_size(name)
+                if count is None or size != actual:
+                    count, size = self._count_lines(name), actual
+                index[name], sizes[name] = count, size
+            self._index, self._sizes = index, sizes
+            self._compressing = stored.get('compressing', {})
+            self._index_mtime = self._index_stamp()
+        return self._index
+
+    def _save_index(self):
+        stored = {'segments': {name: [count, self._sizes.get(name)] for name, count in self._index.items()},
+                  'compressing': self._compressing}
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(stored, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = self._index_stamp()
+
+    def _count_lines(self, name):
+        with self._open(name) as f:
+            return sum(1 for line in f if line.strip())
+
+    def append(self, entry):
+        """Appends one change entry. Cost is independent of the log size."""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """Appends entries to their monthly segments and syncs each segment to disk."""
+        index = self._load_index()
+        by_segment = {}
+        for entry in entries:
+            by_segment.setdefault(self._segment_name(entry.get('timestamp')), []).append(entry)
+        for name, segment_entries in by_segment.items():
+            path = os.path.join(self.directory, name)
+            created = not os.path.exists(path)
+            with open(path, 'a') as f:
+                for entry in segment_entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                fsync_dir(self.directory)
+            index[name] = index.get(name, 0) + len(segment_entries)
+            self._sizes[name] = self._segment_size(name)
+        if by_segment:
+            self._save_index()
+
+    def count(self):
+        return sum(self._load_index().values())
+
+    def iter(self, since=None, until=None, offset=0):
+        """Streams entries in log order.
+
+        `since`/`until` bound the entry timestamp (inclusive/exclusive); whole segments
+        outside the range are skipped by month. `offset` skips that many matching entries
+        from the start, using the per-segment counts when no time filter is given.
+        """
+        since = normalize_time(since)
+        until = normalize_time(until)
+        index = self._load_index()
+        for name in self.segments():
+            month = self._segment_month(name)
+            if since and month < since[:7]:
+                continue
+            if until and month > until[:7]:
+                break
+            if offset and not since and not until and offset >= index.get(name, 0):
+                offset -= index.get(name, 0)
+                continue
+            with self._open(name) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    timestamp = entry.get('timestamp') or ''
+                    if since and timestamp < since:
+                        continue
+                    if until and timestamp >= until:
+                        continue
+                    if offset:
+                        offset -= 1
+                        continue
+                    yield entry
+
+    def compress(self, before_month):
+        """Gzips plain segments for months before `before_month` ('YYYY-MM'). Returns the number compressed.
+
+        A late append to an already compressed month lands in a new plain segment, which is
+        appended to the existing archive as another gzip member on the next run.
+
+        Safe to rerun after a crash: the new archive is built in a temp file, the index
+        records the archive size it expects before the archive replaces the old one, and
+        a plain segment whose archive already has that size is only removed, not appended
+        again.
+        """
+        index = self._load_index()
+        compressed = 0
+        for name in self.segments():
+            if not name.endswith(SEGMENT_SUFFIX) or self._segment_month(name) >= before_month:
+                continue
+            source = os.path.join(self.directory, name)
+            target = name[:-len(SEGMENT_SUFFIX)] + COMPRESSED_SUFFIX
+            target_path = os.path.join(self.directory, target)
+            expected = self._compressing.get(name)
+            if expected is None or self._segment_size(target) != expected:
+                tmp_path = target_path + '.tmp'
+                with open(tmp_path, 'wb') as dst:
+                    if os.path.exists(target_path):
+                        with open(target_path, 'rb') as old:
+                            dst.write(old.read())
+                    with open(source, 'rb') as src, gzip.GzipFile(fileobj=dst, mode='ab') as member:
+                        member.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                self._compressing[name] = os.path.getsize(tmp_path)
+                self._save_index()
+                os.replace(tmp_path, target_path)
+            # The archive holds this segment's lines now; drop the plain copy
+            index[target] = self._count_lines(target)
+            self._sizes[target] = self._segment_size(target)
+            index.pop(name, None)
+            self._sizes.pop(name, None)
+            os.remove(source)
+            fsync_dir(self.directory)
+            self._compressing.pop(name, None)
+            self._save_index()
+            compressed += 1
+        return compressed
+
+    def _import_legacy(self, legacy_path):
+        """Moves a legacy price_changes.json array into segments once."""
+        try:
+            with open(legacy_path, 'r') as f:
+                changes = json.load(f)
+        except Exception as e:
+            print(f"Error reading legacy change log {legacy_path}: {e}")
+            return
+        self.append_many(changes)
+        os.replace(legacy_path, legacy_path + '.migrated')
+        print(f"Imported {len(changes)} price changes from {legacy_path} into {self.directory}")
@@ -0,0 +1,110 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the standard library encoder is used otherwise
+    orjson = None
+
+_NUMBER = (int, float)
+_NONE = type(None)
+
+# Expected types per field. Fields are optional (legacy records predate the typed ones),
+# but when present they must have one of these types.
+LISTING_SCHEMA = {
+    'id': (str, int),
+    'address': (str,),
+    'url': (str,),
+    'price': (str, _NONE),
+    'price_cents': (int, _NONE),
+    'size_m2': _NUMBER + (_NONE,),
+    'room_count': (int, _NONE),
+    'price_per_sqm_cents': (int, _NONE),
+    'maintenance_fee_cents': (int, _NONE),
+    'open_house_times': (list,),
+    'latitude': _NUMBER + (_NONE,),
+    'longitude': _NUMBER + (_NONE,),
+    'geocode_precision': (str,),
+    'profiles': (list,),
+    'source': (str,),
+    'sources': (dict,),
+    'duplicate_of': (str,),
+    'sold': (bool,),
+    'removed': (bool,),
+    'visited': (bool,),
+    'favorite': (bool,),
+    'price_drop': (bool,),
+    'timestamp': _NUMBER + (_NONE,),
+}
+LISTING_REQUIRED = ('id',)
+
+HISTORY_ENTRY_SCHEMA = {
+    'timestamp': (str,),
+    'price': (str, _NONE),
+    'price_cents': (int, _NONE),
+    'open_house': (str, _NONE),
+}
+HISTORY_ENTRY_REQUIRED = ('timestamp',)
+
+
+class CodecError(ValueError):
+    """Raised when a stored record cannot be decoded or does not match its schema."""
+
+    def __init__(self, message, source=None):
+        self.source = source
+        super().__init__(f"{source}: {message}" if source else message)
+
+
+def encode(obj):
+    """Encodes a record as compact UTF-8 JSON bytes (no indentation or padding)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode(data, source=None):
+    """Decodes compact or legacy indented JSON (bytes or str); both parse the same way."""
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except ValueError as e:
+        raise CodecError(f"invalid JSON ({e})", source) from None
+
+
+def _check(record, schema, required, what, source):
+    if not isinstance(record, dict):
+        raise CodecError(f"{what} must be an object, got {type(record).__name__}", source)
+    for name in required:
+        if name not in record:
+            raise CodecError(f"{what} is missing '{name}'", source)
+    for name, types in schema.items():
+        value = record.get(name)
+        if name not in record:
+            continue
+        # bool is an int subclass; True must not pass as a price
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise CodecError(f"{what} field '{name}' has type {type(value).__name__}", source)
+    return record
+
+
+def decode_listing(data, source=None):
+    """Decodes and validates a listing document."""
+    listing = _check(decode(data, source), LISTING_SCHEMA, LISTING_REQUIRED, "listing", source)
+    if not all(isinstance(t, str) for t in listing.get('open_house_times', ())):
+        raise CodecError("listing field 'open_house_times' must hold ISO strings", source)
+    return listing
+
+
+def decode_history_entry(data, source=None):
+    """Decodes and validates a single history entry (SQLite stores one per row)."""
+    return _check(decode(data, source), HISTORY_ENTRY_SCHEMA, HISTORY_ENTRY_REQUIRED, "history entry", source)
+
+
+def decode_history(data, source=None):
+    """Decodes and validates a history document (a list of entries)."""
+    history = decode(data, source)
+    if not isinstance(history, list):
+        raise CodecError(f"history must be a list, got {type(history).__name__}", source)
+    for entry in history:
+        _check(entry, HISTORY_ENTRY_SCHEMA, HISTORY_ENTRY_REQUIRED, "history entry", source)
+    return history
@@ -1,3 +1,4 @@
+import hashlib
 import re
 import json
 import requests
@@ -73,10 +74,19 @@ def parse_config(config_str):
     return base_url, params
 
 def get_search_url_from_file(filepath):
+    """Returns (url, base_url, params) for the first search in the config file."""
     try:
         with open(filepath, 'r') as f:
             content = f.read().strip()
-        
+        profiles = _profile_lines(content)
+        return parse_search(profiles[0][1] if profiles else content)
+    except Exception as e:
+        print(f"Error parsing config: {e}")
+        return None, None, None
+
+def parse_search(content):
+    """Turns one search (a full Oikotie URL or a natural language description) into (url, base_url, params)."""
+    try:
         # Check if the content is already a full URL
         if content.startswith('http://') or content.startswith('https://'):
             # Parse the URL to extract base and params
@@ -107,6 +117,64 @@ def get_search_url_from_file(filepath):
         print(f"Error parsing config: {e}")
         return None, None, None
 
+# "name = <url or description>"; a bare URL has a ':' before its first '=' and does not match
+_PROFILE_RE = re.compile(r'^([\w-]+)\s*=\s*(.+)$')
+
+def _bare_profile_name(search, first):
+    """Name for an unnamed line: 'default' for the first, then one derived from the search itself.
+
+    Names are stored with listings, so they must not change when other lines are added or moved.
+    """
+    if first:
+        return 'default'
+    return f"search-{hashlib.sha1(search.encode('utf-8')).hexdigest()[:8]}"
+
+def _profile_lines(content):
+    """[(name, search)] for each non-empty, non-comment line of a config file."""
+    lines = [line.strip() for line in content.splitlines()]
+    lines = [line for line in lines if line and not line.startswith('#')]
+    profiles = []
+    bare = 0
+    for line in lines:
+        match = _PROFILE_RE.match(line)
+        if match:
+            profiles.append((match.group(1), match.group(2).strip()))
+        else:
+            profiles.append((_bare_profile_name(line, bare == 0), line))
+            bare += 1
+    return profiles
+
+def load_profiles(filepath='config.txt'):
+    """Reads every search profile from the config file.
+
+    The file holds one search per line, either bare (the first bare line is profile
+    'default', further ones are named after a hash of their search) or named as `name = <url or description>`. Lines
+    starting with '#' are ignored. Returns a list of dicts with 'name', 'url',
+    'base_url', 'params' and 'allowed_locations'.
+    """
+    try:
+        with open(filepath, 'r') as f:
+            content = f.read()
+    except OSError as e:
+        print(f"Error reading config: {e}")
+        return []
+    profiles = []
+    for name, search in _profile_lines(content):
+        url, base_url, params = parse_search(search)
+        if not url:
+            print(f"Skipping profile '{name}': could not parse '{search}'")
+            continue
+        profiles.append({'name': name, 'url': url, 'base_url': base_url, 'params': params,
+                         'allowed_locations': get_allowed_locations(params)})
+    return profiles
+
+def is_allowed(address, allowed_locations):
+    """True if no locations are configured or the address mentions one of them (case insensitive)."""
+    if not allowed_locations:
+        return True
+    addr_lower = address.lower()
+    return any(loc.lower() in addr_lower for loc in allowed_locations)
+
 def get_allowed_locations(params):
     """
     Extracts a list of allowed location names from params.
@@ -0,0 +1,250 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+from src.utils.rate_limit import RateLimiter
+
+GEOCODE_CACHE_PATH = os.path.join('data', 'geocode_cache.json')
+GEOCODE_RATE = float(os.getenv('GEOCODE_RATE', '1.0'))                 # Nominatim usage policy: at most 1 request/s
+GEOCODE_MISS_TTL_DAYS = float(os.getenv('GEOCODE_MISS_TTL_DAYS', '30'))  # retry addresses Nominatim did not know after this
+GEOCODE_WAIT = float(os.getenv('GEOCODE_WAIT', '30'))                   # seconds a refresh waits for queued lookups
+OFFLINE_BACKOFF = 300  # seconds without network lookups after the service fails
+
+# Coarse positions used until (or instead of) a street level result: Helsinki region
+# districts first, then whole cities. Matched against the parts of "Street, District, City".
+DISTRICT_CENTROIDS = {
+    'herttoniemenranta': (60.1880, 25.0400),
+    'herttoniemi': (60.1950, 25.0300),
+    'roihuvuori': (60.1990, 25.0560),
+    'kulosaari': (60.1870, 25.0080),
+    'laajasalo': (60.1710, 25.0500),
+    'kalasatama': (60.1870, 24.9770),
+    'sörnäinen': (60.1870, 24.9640),
+    'kallio': (60.1840, 24.9500),
+    'vallila': (60.1930, 24.9560),
+    'arabianranta': (60.2090, 24.9770),
+    'käpylä': (60.2140, 24.9520),
+    'oulunkylä': (60.2290, 24.9650),
+    'pasila': (60.1990, 24.9330),
+    'kruununhaka': (60.1730, 24.9560),
+    'kamppi': (60.1680, 24.9310),
+    'punavuori': (60.1610, 24.9390),
+    'eira': (60.1570, 24.9380),
+    'ullanlinna': (60.1600, 24.9480),
+    'jätkäsaari': (60.1580, 24.9190),
+    'etu-töölö': (60.1750, 24.9250),
+    'taka-töölö': (60.1880, 24.9190),
+    'töölö': (60.1800, 24.9200),
+    'lauttasaari': (60.1580, 24.8750),
+    'munkkiniemi': (60.1970, 24.8800),
+    'pikku huopalahti': (60.2030, 24.8960),
+    'haaga': (60.2200, 24.8950),
+    'viikki': (60.2260, 25.0130),
+    'malmi': (60.2510, 25.0110),
+    'itäkeskus': (60.2100, 25.0800),
+    'kontula': (60.2360, 25.0830),
+    'vuosaari': (60.2090, 25.1440),
+    'tapiola': (60.1760, 24.8050),
+    'leppävaara': (60.2190, 24.8130),
+    'matinkylä': (60.1600, 24.7390),
+    'tikkurila': (60.2930, 25.0440),
+}
+CITY_CENTROIDS = {
+    'helsinki': (60.1699, 24.9384),
+    'espoo': (60.2055, 24.6559),
+    'vantaa': (60.2934, 25.0378),
+    'kauniainen': (60.2100, 24.7290),
+    'tampere': (61.4978, 23.7610),
+    'turku': (60.4518, 22.2666),
+}
+
+# Listings positioned from these tables are looked up again once the network is reachable
+COARSE_PRECISIONS = ('district', 'city')
+
+
+def clean_address(address):
+    """The address as sent to Nominatim: without the '● extra info' suffix cards sometimes carry."""
+    return (address or '').split('●')[0].strip()
+
+
+def normalize_address(address):
+    """Cache key: lower case, single spaces, no space before commas."""
+    text = re.sub(r'\s+', ' ', clean_address(address).lower())
+    return re.sub(r'\s*,\s*', ', ', text).strip(' ,')
+
+
+def centroid_for(address):
+    """(latitude, longitude, precision) from the offline tables, None if no district or city matches."""
+    # The whole address, including anything after '●' that may name the district
+    parts = [re.sub(r'\s+', ' ', p).strip() for p in re.split(r'[,●]', (address or '').lower()) if p.strip()]
+    for table, precision in ((DISTRICT_CENTROIDS, 'district'), (CITY_CENTROIDS, 'city')):
+        for part in reversed(parts):
+            if part in table:
+                return table[part] + (precision,)
+    return None
+
+
+def needs_geocode(listing):
+    """True if the listing has no coordinates or only a district/city centroid."""
+    if not listing.get('latitude') or not listing.get('longitude'):
+        return True
+    return listing.get('geocode_precision') in COARSE_PRECISIONS
+
+
+class Geocoder:
+    """Geocodes addresses through a persistent cache and a background Nominatim queue.
+
+    `locate()` never blocks on the network: it fills coordinates from the cache (or a
+    district centroid) and queues unknown addresses. One worker thread sends the queued
+    lookups at GEOCODE_RATE and stores hits and misses in data/geocode_cache.json;
+    `resolve()` applies finished lookups to listings later in the run.
+    """
+
+    def __init__(self, cache_path=GEOCODE_CACHE_PATH, rate=GEOCODE_RATE, miss_ttl_days=GEOCODE_MISS_TTL_DAYS):
+        self.cache_path = cache_path
+        self.miss_ttl = miss_ttl_days * 24 * 60 * 60
+        self._limiter = RateLimiter(rate)
+        self._geolocator = Nominatim(user_agent="oikotie_tracker")
+        self._lock = threading.Lock()
+        self._cache = self._load()
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._worker = None
+        self._offline_until = 0.0
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._cache, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def cached(self, address):
+        """The cache entry for an address: {'lat', 'lon'} for hits, {'miss': True} for misses.
+
+        Misses expire after GEOCODE_MISS_TTL_DAYS; None means the address was never looked up.
+        """
+        with self._lock:
+            entry = self._cache.get(normalize_address(address))
+        if entry and entry.get('miss') and time.time() - entry.get('at', 0) > self.miss_ttl:
+            return None
+        return entry
+
+    def locate(self, listing):
+        """Fills latitude/longitude without waiting for the network. Returns True if coordinates were set."""
+        if not needs_geocode(listing):
+            return False
+        address = listing.get('address')
+        entry = self.cached(address)
+        if entry and not entry.get('miss'):
+            listing['latitude'], listing['longitude'] = entry['lat'], entry['lon']
+            listing['geocode_precision'] = 'address'
+            return True
+        if entry is None:
+            self.enqueue(address)
+        if not listing.get('latitude') or not listing.get('longitude'):
+            centroid = centroid_for(address)
+            if centroid:
+                listing['latitude'], listing['longitude'], listing['geocode_precision'] = centroid
+                return True
+        return False
+
+    def resolve(self, listings, wait=GEOCODE_WAIT):
+        """Waits up to `wait` seconds for queued lookups, then applies cached results to `listings`.
+
+        Lookups still queued afterwards keep running and are picked up from the cache next time.
+        """
+        missing = sum(1 for listing in listings if needs_geocode(listing))
+        for listing in listings:
+            self.locate(listing)
+        if self._pending and wait:
+            print(f"Geocoding: waiting up to {wait:.0f}s for {len(self._pending)} queued addresses...")
+            deadline = time.monotonic() + wait
+            while self._pending and time.monotonic() < deadline:
+                time.sleep(0.2)
+        for listing in listings:
+            self.locate(listing)
+        coarse = sum(1 for listing in listings if needs_geocode(listing))
+        print(f"Geocoding: {missing - coarse} listings located, {coarse} still without a street level position, "
+              f"{len(self._pending)} lookups queued")
+
+    def enqueue(self, address):
+        key = normalize_address(address)
+        if not key:
+            return
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, daemon=True)
+                self._worker.start()
+        self._queue.put(clean_address(address))
+
+    def _query(self, text):
+        self._limiter.wait()
+        return self._geolocator.geocode(text, country_codes='fi', timeout=10)
+
+    def _lookup(self, address):
+        """Nominatim result for the full address, retried as 'street, city'. Raises when the service fails."""
+        location = self._query(address)
+        if not location and ',' in address:
+            parts = address.split(',')
+            location = self._query(f"{parts[0].strip()}, {parts[-1].strip()}")
+        return location
+
+    def _work(self):
+        while True:
+            address = self._queue.get()
+            key = normalize_address(address)
+            try:
+                if time.monotonic() < self._offline_until:
+                    continue  # dropped for this run, queued again on the next one
+                try:
+                    location = self._lookup(address)
+                except GeocoderTimedOut:
+                    print(f"Geocoding timed out for {address}")
+                    continue
+                except (GeocoderServiceError, OSError) as e:
+                    print(f"Geocoding unavailable ({e}); using district centroids for {OFFLINE_BACKOFF}s")
+                    self._offline_until = time.monotonic() + OFFLINE_BACKOFF
+                    continue
+                if location:
+                    entry = {'lat': location.latitude, 'lon': location.longitude, 'at': time.time()}
+                else:
+                    entry = {'miss': True, 'at': time.time()}
+                with self._lock:
+                    self._cache[key] = entry
+                    try:
+                        self._save()
+                    except OSError as e:
+                        print(f"Could not save geocode cache: {e}")
+            except Exception as e:
+                print(f"Geocoding error for {address}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+def get_geocoder():
+    """Returns the process-wide geocoder, creating it on first use."""
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = Geocoder()
+        return _geocoder
@@ -0,0 +1,181 @@
+import re
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+
+# Numbers as printed on Oikotie/Etuovi: '468 000 €', '75,5 m²', '5 650,00 €/m²'
+# (thousands separated by regular, no-break or narrow no-break spaces)
+_NUMBER_RE = re.compile(r'-?\d[\d \u00a0\u202f]*(?:[.,]\d+)?')
+_SPACES_RE = re.compile(r'[ \u00a0\u202f]')
+_ROOMS_RE = re.compile(r'(\d+)\s*(?:h\b|h\+|huone)', re.IGNORECASE)
+_DATE_RE = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})?(?:\s*(?:klo\s*)?(\d{1,2})[:.](\d{2}))?')
+
+
+def parse_number(text):
+    """Returns the first number in a Finnish formatted string as a float, None if there is none."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    if text == "N/A":
+        return None
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    try:
+        return float(_SPACES_RE.sub('', match.group(0)).replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def parse_cents(text):
+    """Parses a euro amount ('468 000 €', '312,40 €/kk') into integer cents."""
+    value = parse_number(text)
+    return int(round(value * 100)) if value is not None else None
+
+
+def price_cents_of(record):
+    """Typed price of a stored listing or history entry; records written before typed fields are parsed."""
+    if 'price_cents' in record:
+        return record['price_cents']
+    return parse_cents(record.get('price'))
+
+
+def parse_rooms(text):
+    """Parses the room count from strings like '4h+k+s', '95 m² / 4h+k' or '4 huonetta'."""
+    if not text or text == "N/A":
+        return None
+    match = _ROOMS_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+def parse_open_house_times(text, now=None):
+    """Parses open house dates ('18.01. klo 13:00, 25.01. klo 14:00') into datetimes.
+
+    Dates without a year are placed in the year closest to `now`; dates without a time
+    get 23:59 so they stay upcoming for the whole day.
+    """
+    if not text:
+        return []
+    now = now or datetime.now()
+    times = []
+    for match in _DATE_RE.finditer(text):
+        day, month, year, hour, minute = match.groups()
+        day, month = int(day), int(month)
+        if year:
+            year = int(year)
+        else:
+            year = now.year
+            if now.month == 12 and month == 1: year += 1
+            elif now.month == 1 and month == 12: year -= 1
+        try:
+            if hour is not None:
+                times.append(datetime(year, month, day, int(hour), int(minute)))
+            else:
+                times.append(datetime(year, month, day, 23, 59))
+        except ValueError:
+            continue
+    return times
+
+
+def _group_thousands(value):
+    return f"{value:,}".replace(',', ' ')
+
+
+def format_euros(cents, suffix=''):
+    """Formats cents for display: 46800000 -> '468 000 €', 31240 -> '312,40 €'."""
+    if cents is None:
+        return "N/A"
+    euros, rest = divmod(abs(int(cents)), 100)
+    sign = '-' if cents < 0 else ''
+    text = _group_thousands(euros) + (f",{rest:02d}" if rest else '')
+    return f"{sign}{text} €{suffix}"
+
+
+def format_price_per_sqm(cents):
+    if cents is None:
+        return "N/A"
+    return f"{cents / 100:,.2f} €/m²".replace(',', ' ').replace('.', ',')
+
+
+def format_area(m2):
+    if m2 is None:
+        return "N/A"
+    return f"{m2:g}".replace('.', ',') + " m²"
+
+
+TYPED_FIELDS = ('price_cents', 'size_m2', 'room_count', 'price_per_sqm_cents',
+                'maintenance_fee_cents', 'open_house_times')
+
+
+@dataclass
+class Listing:
+    """A listing with its numeric fields parsed once at ingest.
+
+    The scraped display strings (price, size, ...) are kept as they came from the
+    site for rendering; everything that computes with a listing uses the typed fields.
+    """
+    id: str
+    address: str = "Unknown Address"
+    url: str = ""
+    image: str = ""
+    price: str = "N/A"
+    size: str = "N/A"
+    price_per_sqm: str = "N/A"
+    maintenance_fee: str = "N/A"
+    open_house: str = ""
+    toilets: str = "N/A"
+    price_cents: int = None
+    size_m2: float = None
+    room_count: int = None
+    price_per_sqm_cents: int = None
+    maintenance_fee_cents: int = None
+    open_house_times: list = field(default_factory=list)
+    latitude: float = None
+    longitude: float = None
+    sold: bool = False
+    removed: bool = False
+    visited: bool = False
+    favorite: bool = False
+    price_drop: bool = False
+    timestamp: float = 0
+    # Fields this schema does not know about (source, rooms text, ...) are carried along untouched
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a Listing from a stored dict, parsing only typed fields that are missing (legacy records)."""
+        known = {f.name for f in fields(cls)} - {'extra'}
+        listing = cls(**{k: v for k, v in data.items() if k in known})
+        listing.extra = {k: v for k, v in data.items() if k not in known}
+        listing.id = str(listing.id)
+        listing.open_house_times = [
+            datetime.fromisoformat(t) if isinstance(t, str) else t for t in listing.open_house_times or []
+        ]
+        if any(name not in data for name in TYPED_FIELDS):
+            # Legacy record stored before typed fields existed
+            listing.parse()
+        return listing
+
+    @classmethod
+    def from_scraped(cls, data):
+        """Builds a Listing from scraper output, parsing every typed field from the display strings."""
+        return cls.from_dict({k: v for k, v in data.items() if k not in TYPED_FIELDS})
+
+    def parse(self):
+        """Fills the typed fields from the display strings."""
+        self.price_cents = parse_cents(self.price)
+        self.size_m2 = parse_number(self.size)
+        self.room_count = parse_rooms(self.extra.get('rooms') or self.size)
+        self.maintenance_fee_cents = parse_cents(self.maintenance_fee)
+        self.price_per_sqm_cents = parse_cents(self.price_per_sqm)
+        if self.price_per_sqm_cents is None and self.price_cents and self.size_m2:
+            self.price_per_sqm_cents = int(round(self.price_cents / self.size_m2))
+        self.open_house_times = parse_open_house_times(self.open_house)
+        return self
+
+    def to_dict(self):
+        """Returns the storage representation (datetimes as ISO strings)."""
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'extra'}
+        data['open_house_times'] = [t.isoformat() for t in self.open_house_times]
+        data.update(self.extra)
+        return data
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from src.utils import codec
+
+PAGES_DIR = os.path.join('data', 'pages')
+PAGES_INDEX_PATH = os.path.join(PAGES_DIR, 'index.jsonl')
+
+# Set PAGE_ARCHIVE=0 to stop keeping fetched pages
+PAGE_ARCHIVE = os.getenv('PAGE_ARCHIVE', '1') == '1'
+
+_lock = threading.Lock()
+
+
+def _blob_path(digest):
+    return os.path.join(PAGES_DIR, 'blobs', digest[:2], f"{digest}.html.gz")
+
+
+def store_page(kind, key, url, page_html, fetched_at=None):
+    """Archives a fetched page and returns its content hash (None when archiving is off).
+
+    `kind` is 'search' or 'detail'; `key` is the listing ID for detail pages and the page
+    URL for search pages. Blobs are gzipped and named by the SHA-256 of the HTML, so an
+    unchanged page is stored once however often it is fetched; every fetch still gets an
+    index line with its time.
+    """
+    if not PAGE_ARCHIVE or not page_html:
+        return None
+    data = page_html.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    entry = {'kind': kind, 'key': str(key), 'url': url, 'sha256': digest,
+             'fetched_at': fetched_at or time.time()}
+    try:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with _lock:
+            with open(PAGES_INDEX_PATH, 'ab') as f:
+                f.write(codec.encode(entry) + b'\n')
+    except OSError as e:
+        print(f"Could not archive page {url}: {e}")
+        return None
+    return digest
+
+
+def load_page(digest):
+    """The archived HTML for a content hash."""
+    with gzip.open(_blob_path(digest), 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def iter_index(kind=None):
+    """Yields index entries ({'kind', 'key', 'url', 'sha256', 'fetched_at'}) in fetch order."""
+    try:
+        f = open(PAGES_INDEX_PATH, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = codec.decode(line, PAGES_INDEX_PATH)
+            except ValueError as e:
+                # A torn last line from an interrupted run
+                print(f"Skipping index line: {e}")
+                continue
+            if kind is None or entry.get('kind') == kind:
+                yield entry
+
+
+def latest_pages(kind='detail'):
+    """Returns {key: index entry} with the most recent fetch of each page."""
+    latest = {}
+    for entry in iter_index(kind):
+        current = latest.get(entry['key'])
+        if current is None or entry['fetched_at'] >= current['fetched_at']:
+            latest[entry['key']] = entry
+    return latest
+
+
+def archive_stats():
+    """Number of fetches indexed, distinct pages stored and their compressed size."""
+    fetches = sum(1 for _ in iter_index())
+    blobs = size = 0
+    for root, _, files in os.walk(os.path.join(PAGES_DIR, 'blobs')):
+        for name in files:
+            if name.endswith('.html.gz'):
+                blobs += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return {'fetches': fetches, 'blobs': blobs, 'bytes': size}
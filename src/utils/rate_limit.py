@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class RateLimiter:
+    """Spaces out calls from any number of threads to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        """Blocks until the caller may go ahead; each caller reserves the next free slot."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+def host_limiter(kind, url, rate):
+    """The process-wide RateLimiter for one kind of request (e.g. 'search') to the host of `url`.
+
+    Everything sending that kind of request to the host shares it, so concurrent callers
+    such as several search profiles stay within `rate` together.
+    """
+    key = (kind, urlsplit(url).netloc or url)
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(key)
+        if limiter is None:
+            limiter = _host_limiters[key] = RateLimiter(rate)
+        return limiter
+
+
+class AsyncTokenBucket:
+    """Token bucket for asyncio code: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
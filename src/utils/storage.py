@@ -1,15 +1,179 @@
+import bisect
 import json
+import math
 import os
-import glob
+import threading
 from datetime import datetime
 import time
+from src.utils.listing import Listing, TYPED_FIELDS, price_cents_of
+from src.utils import archive
 
 DATA_DIR = 'data'
 LISTINGS_DIR = os.path.join(DATA_DIR, 'listings')
 HISTORY_DIR = os.path.join(DATA_DIR, 'history')
 METADATA_PATH = os.path.join(DATA_DIR, 'metadata.json')
-CHANGES_LOG_PATH = os.path.join(DATA_DIR, 'price_changes.json')
+CHANGES_LOG_PATH = os.path.join(DATA_DIR, 'price_changes.json')  # legacy, see CHANGES_DIR
+CHANGES_DIR = os.path.join(DATA_DIR, 'changes')
+DB_PATH = os.path.join(DATA_DIR, 'oikotie.db')
 
+# 'json' (one file per listing/history) or 'sqlite' (single database at DB_PATH)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+# JSON backend only: 'flat' (one directory each) or 'sharded' (by ID suffix, enumerated from data/manifest.json)
+STORAGE_LAYOUT = os.getenv('STORAGE_LAYOUT', 'flat').lower()
+
+_engine = None
+
+def get_engine():
+    """Returns the configured storage engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        if STORAGE_BACKEND == 'sqlite':
+            from src.utils.storage_sqlite import SqliteEngine
+            _engine = SqliteEngine(DB_PATH)
+        elif STORAGE_BACKEND == 'json' and STORAGE_LAYOUT == 'sharded':
+            from src.utils.storage_json import ShardedJsonEngine
+            _engine = ShardedJsonEngine(DATA_DIR)
+            if _engine.needs_migration():
+                print("Flat listing files found without a manifest; run `make migrate-sharded`")
+        elif STORAGE_BACKEND == 'json':
+            from src.utils.storage_json import JsonFileEngine
+            _engine = JsonFileEngine(DATA_DIR)
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _engine
+
+# --- Read-through cache ---
+# Decoded listings and histories kept in memory and revalidated against the engine's
+# data version, so reads after no writes cost one version check instead of N file reads.
+_cache_lock = threading.Lock()
+_cache = {
+    'version': None,
+    'entries': {},  # lid -> (listing_version, listing, history, stats contribution)
+}
+
+# --- Materialized dashboard stats ---
+# Maintained as deltas whenever a cache entry changes. Time-based buckets are counted
+# with bisect over sorted timestamp indexes instead of scanning every listing.
+_stats = {
+    'total': 0,
+    'price_drops': 0,
+    'first_seen': [],       # sorted first-seen timestamps of active listings
+    'open_house_until': [], # sorted open house deadlines of active, unsold, unvisited listings
+}
+WEEK_SECONDS = 7 * 24 * 60 * 60
+
+def _open_house_deadline(listing):
+    """Returns the end-of-day timestamp of the first open house date, inf if it has no date."""
+    times = listing.get('open_house_times')
+    if not times:
+        return math.inf
+    first = datetime.fromisoformat(times[0])
+    return datetime(first.year, first.month, first.day, 23, 59).timestamp()
+
+def _typed(listing):
+    """Adds typed fields to a listing stored before they existed."""
+    if all(name in listing for name in TYPED_FIELDS):
+        return listing
+    return Listing.from_dict(listing).to_dict()
+
+def _stats_contribution(listing, history):
+    """Precomputes what a single listing adds to the dashboard stats, None if it is not counted."""
+    # Ignore soft-deleted listings
+    if listing.get('removed'):
+        return None
+    
+    first_seen = None
+    try:
+        if history and history[0].get('timestamp'):
+            first_seen = datetime.fromisoformat(history[0]['timestamp']).timestamp()
+    except ValueError:
+        pass
+    
+    # Open house - only count if not sold, not visited and has a truthy value
+    open_house_until = None
+    if listing.get('open_house') and not listing.get('sold', False) and not listing.get('visited'):
+        open_house_until = _open_house_deadline(listing)
+    
+    # Price drop: current price lower than the first recorded one
+    price_drop = False
+    if len(history) > 1:
+        first_price = price_cents_of(history[0]) or 0
+        current_price = listing.get('price_cents') or 0
+        price_drop = first_price > current_price and current_price > 0
+    
+    return (first_seen, open_house_until, price_drop)
+
+def _apply_stats(contribution, sign):
+    if contribution is None:
+        return
+    first_seen, open_house_until, price_drop = contribution
+    _stats['total'] += sign
+    _stats['price_drops'] += sign * int(price_drop)
+    for key, value in (('first_seen', first_seen), ('open_house_until', open_house_until)):
+        if value is None:
+            continue
+        if sign > 0:
+            bisect.insort(_stats[key], value)
+        else:
+            index = bisect.bisect_left(_stats[key], value)
+            if index < len(_stats[key]) and _stats[key][index] == value:
+                del _stats[key][index]
+
+def _set_entry(lid, listing_version, listing, history):
+    """Replaces (or with listing=None removes) a cache entry and updates the stats by delta."""
+    entries = _cache['entries']
+    old = entries.pop(lid, None)
+    if old is not None:
+        _apply_stats(old[3], -1)
+    if listing is not None:
+        listing = _typed(listing)
+        contribution = _stats_contribution(listing, history)
+        entries[lid] = (listing_version, listing, history, contribution)
+        _apply_stats(contribution, +1)
+
+def _refresh_cache():
+    """Brings the cache up to date with the engine and returns a snapshot {lid: entry}."""
+    engine = get_engine()
+    with _cache_lock:
+        entries = _cache['entries']
+        version = engine.data_version()
+        if version != _cache['version']:
+            versions = engine.listing_versions()
+            for lid in list(entries):
+                if lid not in versions:
+                    _set_entry(lid, None, None, None)
+            for lid, listing_version in versions.items():
+                cached = entries.get(lid)
+                if cached and cached[0] == listing_version:
+                    continue
+                try:
+                    listing = engine.load_listing(lid)
+                    history = engine.load_history(lid) if listing is not None else None
+                    _set_entry(lid, listing_version, listing, history)
+                except Exception as e:
+                    print(f"Error reading listing {lid}: {e}")
+            _cache['version'] = version
+        return dict(entries)
+
+def _write_through(items, version_before):
+    """Updates the cache after in-process writes of [(lid, listing or None, history)].
+
+    `version_before` is the engine data version read before writing: if the cache was
+    current then, it stays current and the next read needs no revalidation at all.
+    """
+    engine = get_engine()
+    with _cache_lock:
+        was_current = _cache['version'] == version_before
+        for lid, listing, history in items:
+            lid = str(lid)
+            if listing is None:
+                _set_entry(lid, None, None, None)
+            else:
+                _set_entry(lid, engine.listing_version(lid), dict(listing), list(history))
+        _cache['version'] = engine.data_version() if was_current else None
+
+def _cached_entry(lid):
+    return _refresh_cache().get(str(lid))
 
 def set_last_update():
     """Saves the current timestamp as the last update time."""
@@ -24,303 +188,234 @@ def get_last_update():
             with open(METADATA_PATH, 'r') as f:
                 data = json.load(f)
                 return data.get('last_update')
-        except:
-            pass
+        except (OSError, ValueError) as e:
+            print(f"Error reading {METADATA_PATH}: {e}")
     return None
 
 def save_listing(listing):
     """Saves the current listing state and updates history."""
-    lid = listing['id']
-    listing_path = os.path.join(LISTINGS_DIR, f"{lid}.json")
-    history_path = os.path.join(HISTORY_DIR, f"{lid}_history.json")
+    save_listings([listing])
+
+def save_listings(batch):
+    """Saves a batch of listings, updating history, the change log and price_drop flags.
+
+    The batch is diffed against the cached state in memory and written in one grouped
+    pass by the engine (synced temp files renamed into place for JSON, one transaction for SQLite).
+    """
+    if not batch:
+        return
+    # Work on copies so the parsed fields don't leak into the caller's dicts
+    batch = [dict(listing) for listing in batch]
+    engine = get_engine()
+    version_before = engine.data_version()
+    cached_entries = _refresh_cache()
     
-    # 1. Load existing listing to check for changes
-    old_listing = None
-    if os.path.exists(listing_path):
-        with open(listing_path, 'r') as f:
-            old_listing = json.load(f)
-            
-    # 2. Save current listing (overwrite with latest data)
-    with open(listing_path, 'w') as f:
-        json.dump(listing, f, indent=2, ensure_ascii=False)
-        
-    # 3. Update history if price changed or it's new
     timestamp = datetime.now().isoformat()
-    entry = {
-        'timestamp': timestamp,
-        'price': listing.get('price'),
-        'image': listing.get('image'), # Keep track if image changes
-        'open_house': listing.get('open_house'), # Track if open house added
-        'price_per_sqm': listing.get('price_per_sqm'),
-        'maintenance_fee': listing.get('maintenance_fee')
-    }
+    histories = {}        # lid -> history including entries added by this batch
+    history_appends = {}  # lid -> (stored history, new entries)
+    changes = []
     
-    history = []
-    if os.path.exists(history_path):
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-            
-    # Only append if something meaningful changed or it's the first entry
-    is_new = not history
-    price_changed = bool(history and history[-1]['price'] != entry['price'])
-    open_house_changed = bool(history and history[-1].get('open_house') != entry['open_house'])
-
-    if is_new or price_changed or open_house_changed:
-        history.append(entry)
-        with open(history_path, 'w') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
-            
-        # Log to consolidated price changes file if price changed
-        if price_changed and len(history) >= 2:
-            # Calculate price difference
-            def parse_price(price_str):
-                if not price_str or price_str == "N/A":
-                    return 0.0
-                try:
-                    return float(price_str.replace('€', '').replace(' ', '').replace(',', '.').strip())
-                except:
-                    return 0.0
-            
-            old_price_val = parse_price(history[-2]['price'])
-            new_price_val = parse_price(entry['price'])
-            price_diff = new_price_val - old_price_val
-            price_diff_pct = (price_diff / old_price_val * 100) if old_price_val > 0 else 0
-            
-            change_entry = {
-                'id': lid,
-                'address': listing.get('address'),
-                'old_price': history[-2]['price'],
-                'new_price': entry['price'],
-                'price_difference': f"{price_diff:,.0f} €",
-                'price_difference_pct': f"{price_diff_pct:.1f}%",
-                'size': listing.get('size'),
-                'price_per_sqm': listing.get('price_per_sqm'),
-                'timestamp': timestamp,
-                'url': listing.get('url')
-            }
-            
-            changes = []
-            if os.path.exists(CHANGES_LOG_PATH):
-                try:
-                    with open(CHANGES_LOG_PATH, 'r') as cf:
-                        changes = json.load(cf)
-                except:
-                    pass
-            
-            changes.append(change_entry)
-            with open(CHANGES_LOG_PATH, 'w') as cf:
-                json.dump(changes, cf, indent=2, ensure_ascii=False)
-    
-    # 4. Detect if this listing has had a price drop (current < first recorded)
-    if len(history) >= 2:
-        def parse_price(price_str):
-            if not price_str or price_str == "N/A":
-                return 0.0
-            try:
-                return float(price_str.replace('€', '').replace(' ', '').replace(',', '.').strip())
-            except:
-                return 0.0
-        
-        first_price = parse_price(history[0]['price'])
-        current_price = parse_price(listing.get('price', 'N/A'))
+    for listing in batch:
+        # 0. Parse numeric fields once at ingest
+        listing.update(Listing.from_scraped(listing).to_dict())
+        lid = str(listing['id'])
         
-        listing['price_drop'] = (current_price < first_price and current_price > 0 and first_price > 0)
-    else:
-        listing['price_drop'] = False
-    
-    # Re-save listing with price_drop flag
-    with open(listing_path, 'w') as f:
-        json.dump(listing, f, indent=2, ensure_ascii=False)
+        # 1. Current history, as stored or as already updated earlier in this batch
+        if lid in histories:
+            history = histories[lid]
+        elif lid in cached_entries:
+            history = list(cached_entries[lid][2])
+        else:
+            history = engine.load_history(lid)
+            if not history:
+                # Relisted after compaction: its archived history moves back to the hot store
+                history = archive.load_archived(lid)[1]
+                if history:
+                    history_appends[lid] = ([], history)
 
-def get_dashboard_stats():
-    """Calculates statistics for the dashboard."""
-    stats = {
-        'total': 0,
-        'new_this_week': 0,
-        'price_drops': 0,
-        'open_houses': 0
-    }
-    
-    if not os.path.exists(LISTINGS_DIR):
-        return stats
-        
-    files = [f for f in os.listdir(LISTINGS_DIR) if f.endswith('.json')]
-    
-    now = time.time()
-    week_seconds = 7 * 24 * 60 * 60
-    
-    actual_listings = []
-    for filename in files:
-        file_path = os.path.join(LISTINGS_DIR, filename)
-        try:
-            with open(file_path, 'r') as f:
-                listing = json.load(f)
-                # Ignore soft-deleted listings
-                if listing.get('removed'):
-                    continue
-                actual_listings.append(listing)
+        # 2. Update history if price changed or it's new
+        entry = {
+            'timestamp': timestamp,
+            'price': listing.get('price'),
+            'price_cents': listing['price_cents'],
+            'image': listing.get('image'), # Keep track if image changes
+            'open_house': listing.get('open_house'), # Track if open house added
+            'price_per_sqm': listing.get('price_per_sqm'),
+            'maintenance_fee': listing.get('maintenance_fee')
+        }
                 
-            stats['total'] += 1
-                
-            # Check if new this week (using first history entry timestamp)
-            lid = listing['id']
-            history_path = os.path.join(HISTORY_DIR, f"{lid}_history.json")
-            
-            if os.path.exists(history_path):
-                try:
-                    with open(history_path, 'r') as hf:
-                        history = json.load(hf)
-                        if history and len(history) > 0:
-                            # Parse first entry timestamp
-                            first_timestamp_str = history[0].get('timestamp')
-                            if first_timestamp_str:
-                                first_dt = datetime.fromisoformat(first_timestamp_str)
-                                first_timestamp = first_dt.timestamp()
-                                
-                                if now - first_timestamp < week_seconds:
-                                    stats['new_this_week'] += 1
-                except:
-                    pass
-                
-            # Check open house - only count if not sold and has a truthy value
-            if listing.get('open_house') and not listing.get('sold', False):
-                # Optional: Filter out past open houses if the string contains a date
-                oh_str = listing.get('open_house')
-                is_upcoming = True
-                try:
-                    import re
-                    # Look for date patterns like 18.01.
-                    match = re.search(r'(\d{1,2})\.(\d{1,2})\.', oh_str)
-                    if match:
-                        day = int(match.group(1))
-                        month = int(match.group(2))
-                        now_dt = datetime.now()
-                        year = now_dt.year
-                        if now_dt.month == 12 and month == 1: year += 1
-                        elif now_dt.month == 1 and month == 12: year -= 1
-                        
-                        # Set to end of day
-                        oh_date = datetime(year, month, day, 23, 59)
-                        if oh_date < now_dt:
-                            is_upcoming = False
-                except:
-                    pass
+        # Only append if something meaningful changed or it's the first entry
+        is_new = not history
+        price_changed = bool(history and history[-1]['price'] != entry['price'])
+        open_house_changed = bool(history and history[-1].get('open_house') != entry['open_house'])
+
+        if is_new or price_changed or open_house_changed:
+            stored, new_entries = history_appends.get(lid, (history, []))
+            history_appends[lid] = (stored, new_entries + [entry])
+            history = history + [entry]
                 
-                if is_upcoming and not listing.get('visited'):
-                    stats['open_houses'] += 1
+            # Log to consolidated price changes file if price changed
+            if price_changed and len(history) >= 2:
+                # Calculate price difference
+                old_price_val = price_cents_of(history[-2]) or 0
+                new_price_val = entry['price_cents'] or 0
+                price_diff = new_price_val - old_price_val
+                price_diff_pct = (price_diff / old_price_val * 100) if old_price_val > 0 else 0
                 
-            # Check price drops using history
-            lid = listing['id']
-            history_path = os.path.join(HISTORY_DIR, f"{lid}_history.json")
-            if os.path.exists(history_path):
-                with open(history_path, 'r') as hf:
-                    history = json.load(hf)
-                    if len(history) > 1:
-                        # Simple check: compare first recorded price with current
-                        # Or checking if ANY drop happened. Let's check if current is lower than first
-                        try:
-                             first_price = float(history[0]['price'].replace('€', '').replace(' ', '').replace(',', '.').strip()) if history[0]['price'] != 'N/A' else 0
-                             current_price = float(listing['price'].replace('€', '').replace(' ', '').replace(',', '.').strip()) if listing['price'] != 'N/A' else 0
-                             if first_price > current_price and current_price > 0:
-                                 stats['price_drops'] += 1
-                        except:
-                            pass
-                            
-        except Exception as e:
-            print(f"Error processing stats for {filename}: {e}")
+                changes.append({
+                    'id': listing['id'],
+                    'address': listing.get('address'),
+                    'old_price': history[-2]['price'],
+                    'new_price': entry['price'],
+                    'price_difference': f"{price_diff / 100:,.0f} €",
+                    'price_difference_cents': price_diff,
+                    'price_difference_pct': f"{price_diff_pct:.1f}%",
+                    'size': listing.get('size'),
+                    'price_per_sqm': listing.get('price_per_sqm'),
+                    'timestamp': timestamp,
+                    'url': listing.get('url')
+                })
+        histories[lid] = history
+        
+        # 3. Detect if this listing has had a price drop (current < first recorded)
+        if len(history) >= 2:
+            first_price = price_cents_of(history[0]) or 0
+            current_price = listing['price_cents'] or 0
             
-    return stats
+            listing['price_drop'] = (current_price < first_price and current_price > 0 and first_price > 0)
+        else:
+            listing['price_drop'] = False
+    
+    # 4. Write everything (listings already carry their price_drop flag) in one pass
+    latest = {str(listing['id']): listing for listing in batch}
+    engine.write_batch(list(latest.values()), history_appends, changes)
+    _write_through([(lid, listing, histories[lid]) for lid, listing in latest.items()], version_before)
+
+def get_dashboard_stats():
+    """Returns statistics for the dashboard from the incrementally maintained summary."""
+    _refresh_cache()
+    now = time.time()
+    with _cache_lock:
+        return {
+            'total': _stats['total'],
+            'new_this_week': len(_stats['first_seen']) - bisect.bisect_right(_stats['first_seen'], now - WEEK_SECONDS),
+            'price_drops': _stats['price_drops'],
+            'open_houses': len(_stats['open_house_until']) - bisect.bisect_left(_stats['open_house_until'], now)
+        }
 
-def get_all_listings():
+def get_all_listings(include_removed=False):
     """Returns a list of all current listing objects."""
-    files = glob.glob(os.path.join(LISTINGS_DIR, "*.json"))
-    listings = []
-    for fpath in files:
-        try:
-            with open(fpath, 'r') as f:
-                listing = json.load(f)
-                if not listing.get('removed'):
-                    listings.append(listing)
-        except Exception as e:
-            print(f"Error reading {fpath}: {e}")
-    return listings
+    # Copies, so callers can mutate them without corrupting the cache
+    return [dict(listing) for _, listing, _, _ in _refresh_cache().values()
+            if include_removed or not listing.get('removed')]
+
+def _set_flag(lid, flag, value):
+    engine = get_engine()
+    version_before = engine.data_version()
+    cached = _cached_entry(lid)
+    if cached is None:
+        return False
+    listing = dict(cached[1])
+    listing[flag] = value
+    engine.store_listing(listing)
+    _write_through([(lid, listing, cached[2])], version_before)
+    return True
 
 def mark_visited(lid, visited=True):
     """Marks a listing as visited."""
-    listing_path = os.path.join(LISTINGS_DIR, f"{lid}.json")
-    if os.path.exists(listing_path):
-        with open(listing_path, 'r') as f:
-            listing = json.load(f)
-        listing['visited'] = visited
-        with open(listing_path, 'w') as f:
-            json.dump(listing, f, indent=2, ensure_ascii=False)
-        return True
-    return False
+    return _set_flag(lid, 'visited', visited)
 
 def mark_removed(lid, removed=True):
     """Marks a listing as removed (soft delete)."""
-    listing_path = os.path.join(LISTINGS_DIR, f"{lid}.json")
-    if os.path.exists(listing_path):
-        with open(listing_path, 'r') as f:
-            listing = json.load(f)
-        listing['removed'] = removed
-        with open(listing_path, 'w') as f:
-            json.dump(listing, f, indent=2, ensure_ascii=False)
-        return True
-    return False
+    return _set_flag(lid, 'removed', removed)
 
 def mark_favorite(lid, favorite=True):
     """Marks a listing as favorite."""
-    listing_path = os.path.join(LISTINGS_DIR, f"{lid}.json")
-    if os.path.exists(listing_path):
-        with open(listing_path, 'r') as f:
-            listing = json.load(f)
-        listing['favorite'] = favorite
-        with open(listing_path, 'w') as f:
-            json.dump(listing, f, indent=2, ensure_ascii=False)
-        return True
-    return False
+    return _set_flag(lid, 'favorite', favorite)
 
 def get_history(lid):
-    history_path = os.path.join(HISTORY_DIR, f"{lid}_history.json")
-    if os.path.exists(history_path):
-        with open(history_path, 'r') as f:
-            return json.load(f)
-    return []
+    cached = _cached_entry(lid)
+    if cached is None:
+        # Not in the hot store: compacted listings are served from the cold archive
+        return get_engine().load_history(lid) or archive.load_archived(lid)[1]
+    return [dict(entry) for entry in cached[2]]
+
+def iter_archived_listings():
+    """Yields (listing, history) for compacted listings that are no longer in the hot store."""
+    hot = _refresh_cache()
+    for listing, history in archive.iter_archived():
+        if str(listing['id']) not in hot:
+            yield listing, history
+
+def compact_history(max_age_days=None):
+    """Moves sold/removed listings idle for more than `max_age_days` into the cold archive.
+
+    Listings are written to the archive before they are deleted from the hot store, so an
+    interrupted run leaves them readable from either side. Change log months older than
+    the cutoff are compressed too. Returns the number of listings archived.
+    """
+    if max_age_days is None:
+        max_age_days = archive.ARCHIVE_AFTER_DAYS
+    engine = get_engine()
+    version_before = engine.data_version()
+    now = time.time()
+    items = [(listing, history) for _, listing, history, _ in _refresh_cache().values()
+             if archive.is_archivable(listing, history, now=now, max_age_days=max_age_days)]
+
+    archive.archive_listings(items)
+    for listing, _ in items:
+        engine.delete_listing(listing['id'])
+    _write_through([(str(listing['id']), None, None) for listing, _ in items], version_before)
+
+    cutoff_month = datetime.fromtimestamp(now - max_age_days * 24 * 60 * 60).strftime('%Y-%m')
+    engine.compress_changes(cutoff_month)
+    return len(items)
+
+def get_price_changes():
+    """Returns the consolidated list of logged price changes."""
+    return list(iter_price_changes())
+
+def iter_price_changes(since=None, until=None, offset=0):
+    """Streams logged price changes in order, optionally from an offset or within [since, until)."""
+    return get_engine().iter_changes(since=since, until=until, offset=offset)
+
+def count_price_changes():
+    """Returns the number of logged price changes without reading them."""
+    return get_engine().count_changes()
 
 def cleanup_listings():
-    """Removes listings that are out of bounds according to the config."""
-    from src.utils.config_parser import get_search_url_from_file, get_allowed_locations
-    
-    url, base_url, params = get_search_url_from_file('config.txt')
-    allowed_locations = get_allowed_locations(params)
+    """Removes listings that are out of bounds according to the config, profile by profile.
+
+    A listing keeps the profiles it was found by whose location filter still matches its
+    address. Listings from before profiles were recorded, and listings one of whose
+    profiles no longer exists (renamed or removed), are checked against all current
+    profiles, so renaming a profile never deletes anything. Listings left without any
+    matching profile are deleted.
+    """
+    from src.utils.config_parser import load_profiles, is_allowed
     
-    if not allowed_locations:
+    profiles = {p['name']: p for p in load_profiles('config.txt')}
+    if not profiles:
         return 0, []
 
+    engine = get_engine()
     listings = get_all_listings()
     removed_ids = []
     
     for listing in listings:
-        address = listing.get('address', '').lower()
-        match_found = False
-        for loc in allowed_locations:
-            if loc.lower() in address:
-                match_found = True
-                break
-        
-        if not match_found:
-            lid = listing['id']
-            # Delete listing file
-            fpath = os.path.join(LISTINGS_DIR, f"{lid}.json")
-            if os.path.exists(fpath):
-                os.remove(fpath)
-            
-            # Delete history file
-            hpath = os.path.join(HISTORY_DIR, f"{lid}_history.json")
-            if os.path.exists(hpath):
-                os.remove(hpath)
-            
+        address = listing.get('address', '')
+        recorded = listing.get('profiles') or []
+        if not recorded or any(name not in profiles for name in recorded):
+            recorded = list(dict.fromkeys([name for name in recorded if name in profiles] + list(profiles)))
+        keep = [name for name in recorded if is_allowed(address, profiles[name]['allowed_locations'])]
+        lid = listing['id']
+        if not keep:
+            # Delete listing and its history
+            version_before = engine.data_version()
+            engine.delete_listing(lid)
+            _write_through([(lid, None, None)], version_before)
             removed_ids.append(lid)
+        elif listing.get('profiles') and keep != listing['profiles']:
+            _set_flag(lid, 'profiles', keep)
             
     return len(removed_ids), removed_ids
@@ -0,0 +1,295 @@
+import os
+from src.utils import codec
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are not locked across processes
+    fcntl = None
+from src.utils.changelog import ChangeLog, fsync_dir
+
+
+class JsonFileEngine:
+    """Storage engine keeping one JSON document per listing and per history.
+
+    Documents are written compactly through the codec and validated when read; files
+    still pretty-printed by older versions are read as-is and rewritten compact on the
+    next save.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.listings_dir = os.path.join(data_dir, 'listings')
+        self.history_dir = os.path.join(data_dir, 'history')
+        # Legacy single-file change log, imported into the segmented log on first use
+        self.changes_path = os.path.join(data_dir, 'price_changes.json')
+        self.changes_dir = os.path.join(data_dir, 'changes')
+        # Touched on every write so readers can detect changes with a single stat
+        self.version_path = os.path.join(data_dir, '.data_version')
+        os.makedirs(self.listings_dir, exist_ok=True)
+        os.makedirs(self.history_dir, exist_ok=True)
+        self._writes = 0
+        self.changelog = ChangeLog(self.changes_dir, legacy_path=self.changes_path)
+
+    def _listing_path(self, lid):
+        return os.path.join(self.listings_dir, f"{lid}.json")
+
+    def _history_path(self, lid):
+        return os.path.join(self.history_dir, f"{lid}_history.json")
+
+    def _write_atomic(self, path, data):
+        """Writes and syncs a temp file next to `path` and returns it; the caller renames it into place."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(codec.encode(data))
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _bump_version(self):
+        self._writes += 1
+        with open(self.version_path, 'a'):
+            os.utime(self.version_path, None)
+
+    # --- Change detection ---
+
+    def data_version(self):
+        """Returns a token that changes whenever any listing or history is written (O(1) stats)."""
+        stamps = [self._writes]
+        for path in (self.version_path, self.listings_dir, self.history_dir):
+            try:
+                stamps.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def listing_versions(self):
+        """Returns {listing_id: version} from file metadata only, without reading any documents."""
+        history_stamps = {}
+        with os.scandir(self.history_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('_history.json'):
+                    st = entry.stat()
+                    history_stamps[entry.name[:-len('_history.json')]] = (st.st_mtime_ns, st.st_size)
+
+        versions = {}
+        with os.scandir(self.listings_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json'):
+                    lid = entry.name[:-len('.json')]
+                    st = entry.stat()
+                    versions[lid] = (st.st_mtime_ns, st.st_size, history_stamps.get(lid))
+        return versions
+
+    def listing_version(self, lid):
+        """Returns the version of a single listing, in the same form as listing_versions()."""
+        try:
+            st = os.stat(self._listing_path(lid))
+        except FileNotFoundError:
+            return None
+        try:
+            hst = os.stat(self._history_path(lid))
+            history_stamp = (hst.st_mtime_ns, hst.st_size)
+        except FileNotFoundError:
+            history_stamp = None
+        return (st.st_mtime_ns, st.st_size, history_stamp)
+
+    # --- Listings ---
+
+    def load_listing(self, lid):
+        path = self._listing_path(lid)
+        if not os.path.exists(path):
+            return None
+        return codec.decode_listing(self._read(path), path)
+
+    def store_listing(self, listing):
+        path = self._listing_path(listing['id'])
+        os.replace(self._write_atomic(path, listing), path)
+        fsync_dir(os.path.dirname(path))
+        self._bump_version()
+
+    def iter_listings(self):
+        """Yields every stored listing, including soft-deleted ones."""
+        for filename in os.listdir(self.listings_dir):
+            if not filename.endswith('.json'):
+                continue
+            fpath = os.path.join(self.listings_dir, filename)
+            try:
+                yield codec.decode_listing(self._read(fpath), fpath)
+            except (OSError, codec.CodecError) as e:
+                print(f"Error reading {fpath}: {e}")
+
+    def delete_listing(self, lid):
+        """Deletes the listing document and its history."""
+        for path in (self._listing_path(lid), self._history_path(lid)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._bump_version()
+
+    # --- History ---
+
+    def load_history(self, lid):
+        path = self._history_path(lid)
+        if not os.path.exists(path):
+            return []
+        return codec.decode_history(self._read(path), path)
+
+    # --- Batches ---
+
+    def write_batch(self, listings, history_appends, changes):
+        """Writes a group of listings, history appends {lid: (history, new_entries)} and change entries.
+
+        All documents go to synced temp files first and are only then renamed into place, so a
+        crash leaves either the old or the new version of each file. The directories holding
+        the renamed files are synced afterwards, and the change-log append syncs its segment,
+        so the batch is on disk when this returns.
+        """
+        pending = []
+        for lid, (history, new_entries) in history_appends.items():
+            path = self._history_path(lid)
+            pending.append((self._write_atomic(path, history + new_entries), path))
+        for listing in listings:
+            path = self._listing_path(listing['id'])
+            pending.append((self._write_atomic(path, listing), path))
+
+        for tmp_path, path in pending:
+            os.replace(tmp_path, path)
+        for directory in {os.path.dirname(path) for _, path in pending}:
+            fsync_dir(directory)
+        if changes:
+            self.changelog.append_many(changes)
+        self._bump_version()
+
+    # --- Price changes ---
+
+    def iter_changes(self, since=None, until=None, offset=0):
+        return self.changelog.iter(since=since, until=until, offset=offset)
+
+    def count_changes(self):
+        return self.changelog.count()
+
+    def load_changes(self):
+        return list(self.iter_changes())
+
+    def append_change(self, entry):
+        self.changelog.append(entry)
+
+    def compress_changes(self, before_month):
+        return self.changelog.compress(before_month)
+
+
+def shard_of(lid):
+    """Shard directory for a listing ID: its last two characters.
+
+    Oikotie IDs are sequential, so the trailing digits spread listings evenly over 100
+    shards where a leading prefix would put nearly all of them in the same one.
+    """
+    return str(lid)[-2:].rjust(2, '0')
+
+
+class ShardedJsonEngine(JsonFileEngine):
+    """JSON engine that spreads documents over shard directories and enumerates them from a manifest.
+
+    `data/manifest.json` maps every stored listing ID to a version counter that is bumped
+    on each write, so listing, revalidating and counting listings read one file instead of
+    scanning directories.
+    """
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.manifest_path = os.path.join(data_dir, 'manifest.json')
+        self._manifest = None
+        self._manifest_mtime = None
+
+    def needs_migration(self):
+        """True when flat-layout listing files exist but no manifest has been built yet."""
+        return not os.path.exists(self.manifest_path) and any(
+            f.endswith('.json') for f in os.listdir(self.listings_dir))
+
+    def _listing_path(self, lid):
+        return os.path.join(self.listings_dir, shard_of(lid), f"{lid}.json")
+
+    def _history_path(self, lid):
+        return os.path.join(self.history_dir, shard_of(lid), f"{lid}_history.json")
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return super()._write_atomic(path, data)
+
+    # --- Manifest ---
+
+    def _manifest_stamp(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load_manifest(self):
+        """Returns {'counter': int, 'listings': {lid: version}}, re-read only when the file changed."""
+        stamp = self._manifest_stamp()
+        if self._manifest is None or stamp != self._manifest_mtime:
+            manifest = {'counter': 0, 'listings': {}}
+            if stamp is not None:
+                manifest = codec.decode(self._read(self.manifest_path), self.manifest_path)
+            self._manifest = manifest
+            self._manifest_mtime = stamp
+        return self._manifest
+
+    def _update_manifest(self, written=(), deleted=()):
+        """Bumps the version of written IDs and drops deleted ones, holding a lock across processes."""
+        with open(self.manifest_path + '.lock', 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Re-read under the lock so concurrent writers (scraper and dashboard) don't lose updates
+            self._manifest = None
+            manifest = self.load_manifest()
+            manifest['counter'] += 1
+            for lid in written:
+                manifest['listings'][str(lid)] = manifest['counter']
+            for lid in deleted:
+                manifest['listings'].pop(str(lid), None)
+            tmp_path = self.manifest_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(codec.encode(manifest))
+            os.replace(tmp_path, self.manifest_path)
+            self._manifest_mtime = self._manifest_stamp()
+        self._bump_version()
+
+    # --- Change detection ---
+
+    def data_version(self):
+        return (self._writes, self._manifest_stamp())
+
+    def listing_versions(self):
+        return dict(self.load_manifest()['listings'])
+
+    def listing_version(self, lid):
+        return self.load_manifest()['listings'].get(str(lid))
+
+    # --- Listings ---
+
+    def iter_listings(self):
+        """Yields every stored listing, including soft-deleted ones, in manifest order."""
+        for lid in list(self.load_manifest()['listings']):
+            try:
+                listing = self.load_listing(lid)
+            except (OSError, codec.CodecError) as e:
+                print(f"Error reading listing {lid}: {e}")
+                continue
+            if listing is not None:
+                yield listing
+
+    def store_listing(self, listing):
+        super().store_listing(listing)
+        self._update_manifest(written=[listing['id']])
+
+    def delete_listing(self, lid):
+        super().delete_listing(lid)
+        self._update_manifest(deleted=[lid])
+
+    def write_batch(self, listings, history_appends, changes):
+        super().write_batch(listings, history_appends, changes)
+        self._update_manifest(written=[listing['id'] for listing in listings] + list(history_appends))
@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import threading
+import time
+from src.utils import codec
+from src.utils.changelog import normalize_time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    removed INTEGER NOT NULL DEFAULT 0,
+    sold INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_listings_removed ON listings(removed);
+
+CREATE TABLE IF NOT EXISTS history (
+    listing_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    price TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (listing_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+
+CREATE TABLE IF NOT EXISTS price_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    listing_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_changes_listing ON price_changes(listing_id);
+CREATE INDEX IF NOT EXISTS idx_price_changes_timestamp ON price_changes(timestamp);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+"""
+
+
+def _dumps(data):
+    return codec.encode(data).decode('utf-8')
+
+
+class SqliteEngine:
+    """Storage engine keeping listings, history points and price changes in one SQLite database."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # Connections are not shared between threads (Flask serves requests on several)
+        self._local = threading.local()
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(listings)")]
+            if columns and 'version' not in columns:
+                conn.execute("ALTER TABLE listings ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _bump_version(self, conn, lid=None):
+        """Increments the global data version (and the listing version) inside the open transaction."""
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+        if lid is not None:
+            conn.execute("UPDATE listings SET version = version + 1 WHERE id = ?", (str(lid),))
+
+    # --- Change detection ---
+
+    def data_version(self):
+        """Returns a counter that changes whenever any listing or history is written."""
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return row[0] if row else 0
+
+    def listing_versions(self):
+        """Returns {listing_id: version} without decoding any documents."""
+        return dict(self._connect().execute("SELECT id, version FROM listings"))
+
+    def listing_version(self, lid):
+        """Returns the version of a single listing, None if it is not stored."""
+        row = self._connect().execute("SELECT version FROM listings WHERE id = ?", (str(lid),)).fetchone()
+        return row[0] if row else None
+
+    # --- Listings ---
+
+    def load_listing(self, lid):
+        row = self._connect().execute(
+            "SELECT data FROM listings WHERE id = ?", (str(lid),)
+        ).fetchone()
+        return codec.decode_listing(row[0], f"listing {lid}") if row else None
+
+    def store_listing(self, listing):
+        with self._connect() as conn:
+            self._upsert_listing(conn, listing)
+            self._bump_version(conn, listing['id'])
+
+    def _upsert_listing(self, conn, listing):
+        conn.execute(
+            "INSERT INTO listings (id, data, removed, sold, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, removed = excluded.removed, "
+            "sold = excluded.sold, updated_at = excluded.updated_at",
+            (str(listing['id']), _dumps(listing), int(bool(listing.get('removed'))),
+             int(bool(listing.get('sold'))), time.time())
+        )
+
+    def iter_listings(self):
+        """Yields every stored listing, including soft-deleted ones."""
+        for lid, data in self._connect().execute("SELECT id, data FROM listings"):
+            try:
+                yield codec.decode_listing(data, f"listing {lid}")
+            except codec.CodecError as e:
+                print(f"Error reading {self.db_path}: {e}")
+
+    def delete_listing(self, lid):
+        """Deletes the listing row and its history points."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM listings WHERE id = ?", (str(lid),))
+            conn.execute("DELETE FROM history WHERE listing_id = ?", (str(lid),))
+            self._bump_version(conn)
+
+    # --- History ---
+
+    def load_history(self, lid):
+        rows = self._connect().execute(
+            "SELECT data FROM history WHERE listing_id = ? ORDER BY seq", (str(lid),)
+        ).fetchall()
+        return [codec.decode_history_entry(data, f"history {lid}") for (data,) in rows]
+
+    # --- Batches ---
+
+    def write_batch(self, listings, history_appends, changes):
+        """Writes a group of listings, history appends {lid: (history, new_entries)} and change entries in one transaction."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO history (listing_id, seq, timestamp, price, data) VALUES (?, ?, ?, ?, ?)",
+                [(str(lid), len(history) + i, entry.get('timestamp') or '', entry.get('price'), _dumps(entry))
+                 for lid, (history, new_entries) in history_appends.items()
+                 for i, entry in enumerate(new_entries)]
+            )
+            for listing in listings:
+                self._upsert_listing(conn, listing)
+                self._bump_version(conn, listing['id'])
+            conn.executemany(
+                "INSERT INTO price_changes (listing_id, timestamp, data) VALUES (?, ?, ?)",
+                [(str(entry['id']), entry.get('timestamp') or '', _dumps(entry)) for entry in changes]
+            )
+
+    # --- Price changes ---
+
+    def iter_changes(self, since=None, until=None, offset=0):
+        """Streams change entries in log order, optionally bounded by timestamp [since, until)."""
+        since = normalize_time(since)
+        until = normalize_time(until)
+        query = "SELECT data FROM price_changes WHERE 1 = 1"
+        params = []
+        if since:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until:
+            query += " AND timestamp < ?"
+            params.append(until)
+        query += " ORDER BY seq LIMIT -1 OFFSET ?"
+        params.append(int(offset))
+        for (data,) in self._connect().execute(query, params):
+            yield codec.decode(data)
+
+    def count_changes(self):
+        return self._connect().execute("SELECT COUNT(*) FROM price_changes").fetchone()[0]
+
+    def load_changes(self):
+        return list(self.iter_changes())
+
+    def append_change(self, entry):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO price_changes (listing_id, timestamp, data) VALUES (?, ?, ?)",
+                (str(entry['id']), entry.get('timestamp') or '', _dumps(entry))
+            )
+
+    def compress_changes(self, before_month):
+        # Rows are already stored compactly in the database; nothing to compress
+        return 0
+
+    # --- Migration ---
+
+    def import_listing(self, listing, history):
+        """Bulk-imports one listing and its full history, replacing anything stored for that ID."""
+        lid = str(listing['id'])
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE listing_id = ?", (lid,))
+            self._upsert_listing(conn, listing)
+            conn.executemany(
+                "INSERT INTO history (listing_id, seq, timestamp, price, data) VALUES (?, ?, ?, ?, ?)",
+                [(lid, seq, entry.get('timestamp') or '', entry.get('price'), _dumps(entry))
+                 for seq, entry in enumerate(history)]
+            )
+            self._bump_version(conn, lid)
+
+    def import_changes(self, changes):
+        """Bulk-imports price change entries (any iterable), replacing the existing change log."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM price_changes")
+            cursor = conn.executemany(
+                "INSERT INTO price_changes (listing_id, timestamp, data) VALUES (?, ?, ?)",
+                ((str(entry.get('id')), entry.get('timestamp') or '', _dumps(entry)) for entry in changes)
+            )
+            return cursor.rowcount
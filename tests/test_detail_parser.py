@@ -0,0 +1,44 @@
+"""Golden tests for parse_detail_page against the saved detail pages under debug/."""
+import os
+import pytest
+from src.scrapers.detail_parser import apply_details, has_details, parse_detail_page
+
+DEBUG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'debug')
+
+
+def _parse(name):
+    with open(os.path.join(DEBUG_DIR, name), 'r', encoding='utf-8') as f:
+        return parse_detail_page(f.read())
+
+
+def test_active_listing():
+    fields = _parse('detail_active.html')
+    assert fields['price_per_sqm'] == "5 333 €/m²"
+    assert fields['maintenance_fee'] == "312,00 € / kk"
+    assert fields['toilets'] == "2 WC (sis. erillinen WC)"
+    assert fields['open_house'] == "su 18.1. klo 13:00 - 13:30 | su 25.1. klo 14:00 - 14:30"
+    assert fields['image'] == "https://cdn.asunnot.oikotie.fi/1920x1080/22334455-1.jpg"
+    # 'myyty' inside <script> blocks is not visible text
+    assert 'sold' not in fields
+    assert has_details(fields)
+
+
+def test_sold_listing():
+    fields = _parse('detail_sold.html')
+    assert fields['sold'] is True
+    assert fields['open_house'] == ""
+    assert fields['image'] == "https://cdn.asunnot.oikotie.fi/og/default.jpg"
+    assert has_details(fields)
+
+
+@pytest.mark.parametrize('toilets', ["N/A", None])
+def test_description_toilets_fill_missing_composition(toilets):
+    listing = {'id': '1', 'toilets': toilets, 'open_house': "Esittely"}
+    apply_details(listing, {'description_toilets': "Erillinen WC", 'open_house': "su 18.1. klo 13:00"})
+    assert listing['toilets'] == "Erillinen WC"
+    assert listing['open_house'] == "su 18.1. klo 13:00"
+
+
+def test_composition_wins_over_description():
+    listing = apply_details({'toilets': "N/A"}, {'toilets': "2 WC", 'description_toilets': "Erillinen WC"})
+    assert listing['toilets'] == "2 WC"
@@ -0,0 +1,60 @@
+"""Golden tests for the otAsunnot search card mapping against debug/search_cards.html."""
+import os
+from src.scrapers.scraper_http import card_to_listing, filter_allowed, parse_search_cards
+from src.utils.listing import parse_cents, parse_number
+
+DEBUG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'debug')
+
+
+def _page(name):
+    with open(os.path.join(DEBUG_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_parse_search_cards():
+    listings, total = parse_search_cards(_page('search_cards.html'))
+    # The search's own count, not the nationwide one in <title>
+    assert total == 3
+    assert [l['id'] for l in listings] == ['22334455', '22334466', '22334477']
+
+    first = listings[0]
+    assert first['address'] == "Kettutie 5 A 3, Herttoniemi, Helsinki"
+    assert parse_cents(first['price']) == 400000_00
+    assert parse_number(first['size']) == 75
+    assert first['rooms'] == "4h, k, kph, 2 wc"
+    assert (first['latitude'], first['longitude']) == (60.1952, 25.0311)
+    assert first['open_house'] == "Esittely"
+    assert first['image'] == "https://cdn.asunnot.oikotie.fi/wide/22334455.jpg"
+    assert first['sold'] is False
+
+
+def test_numeric_fields_and_relative_urls():
+    listings, _ = parse_search_cards(_page('search_cards.html'))
+    second = listings[1]
+    assert second['url'] == "https://asunnot.oikotie.fi/myytavat-asunnot/helsinki/22334466"
+    assert parse_cents(second['price']) == 289000_00
+    assert parse_number(second['size']) == 48.5
+    assert parse_cents(second['price_per_sqm']) == round(289000_00 / 48.5)
+    assert second['latitude'] is None and second['open_house'] == ""
+    assert second['image'] == "https://cdn.asunnot.oikotie.fi/list/22334466.jpg"
+    assert 'rooms' not in second
+
+
+def test_sparse_card():
+    listing = card_to_listing({'cardId': 7, 'address': "Kulosaaren puistotie 10, Helsinki", 'visits': []})
+    assert listing['id'] == '7'
+    assert listing['url'] == "https://asunnot.oikotie.fi/myytavat-asunnot/7"
+    assert listing['price'] == listing['size'] == listing['price_per_sqm'] == "N/A"
+    assert listing['open_house'] == ""
+
+
+def test_location_filter():
+    listings, _ = parse_search_cards(_page('search_cards.html'))
+    kept = filter_allowed(listings, ['Herttoniemenranta'])
+    assert [l['id'] for l in kept] == ['22334466']
+
+
+def test_page_without_card_data():
+    # The saved live page renders its cards client-side
+    listings, _ = parse_search_cards(_page('debug_page.html'))
+    assert listings is None
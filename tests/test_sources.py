@@ -0,0 +1,84 @@
+"""Cross-site duplicate linking in merge_sources, within one refresh and across refreshes."""
+from src.scrapers.sources import Source, merge_sources
+
+
+class Oikotie(Source):
+    name = 'oikotie'
+
+
+class Etuovi(Source):
+    name = 'etuovi'
+
+
+def _listing(lid, address, price, source, **extra):
+    listing = {'id': lid, 'address': address, 'size': "75 m²", 'price': price,
+               'url': f"https://{source}.example/{lid}", 'source': source}
+    listing.update(extra)
+    return listing
+
+
+def _by_id(listings):
+    return {str(listing['id']): listing for listing in listings}
+
+
+def test_same_run_duplicate_is_linked():
+    merged = merge_sources([
+        (Oikotie(), [_listing('1', "Kettutie 5 A 3, Herttoniemi, Helsinki", "400 000 €", 'oikotie')]),
+        (Etuovi(), [_listing('etuovi_9', "Kettutie 5 A 3, Helsinki", "395 000 €", 'etuovi')]),
+    ])
+    assert [l['id'] for l in merged] == ['1']
+    assert set(merged[0]['sources']) == {'oikotie', 'etuovi'}
+
+
+def test_different_units_in_one_building_stay_apart():
+    merged = merge_sources([
+        (Oikotie(), [_listing('1', "Kettutie 5 A 3, Herttoniemi, Helsinki", "400 000 €", 'oikotie')]),
+        (Etuovi(), [_listing('etuovi_9', "Kettutie 5 B 12, Helsinki", "395 000 €", 'etuovi')]),
+    ])
+    assert len(merged) == 2
+
+
+def test_stored_lower_priority_record_is_superseded_across_runs():
+    # Etuovi's copy was stored in an earlier run; now Oikotie lists the apartment too
+    stored = [_listing('etuovi_9', "Kettutie 5 A 3, Helsinki", "395 000 €", 'etuovi',
+                       sources={'etuovi': "https://etuovi.example/etuovi_9"})]
+    merged = _by_id(merge_sources(
+        [(Oikotie(), [_listing('1', "Kettutie 5 A 3, Herttoniemi, Helsinki", "400 000 €", 'oikotie')]),
+         (Etuovi(), [])],
+        stored))
+    assert set(merged['1']['sources']) == {'oikotie', 'etuovi'}
+    assert merged['etuovi_9']['removed'] is True
+    assert merged['etuovi_9']['duplicate_of'] == '1'
+
+
+def test_stored_copy_of_dropped_duplicate_is_superseded():
+    # Both portals return the apartment, but Etuovi's copy is still stored on its own
+    stored = [_listing('etuovi_9', "Kettutie 5 A 3, Helsinki", "395 000 €", 'etuovi')]
+    merged = _by_id(merge_sources([
+        (Oikotie(), [_listing('1', "Kettutie 5 A 3, Herttoniemi, Helsinki", "400 000 €", 'oikotie')]),
+        (Etuovi(), [_listing('etuovi_9', "Kettutie 5 A 3, Helsinki", "395 000 €", 'etuovi')]),
+    ], stored))
+    assert merged['etuovi_9']['removed'] is True
+    assert 'etuovi' in merged['1']['sources']
+
+
+def test_stored_higher_priority_record_gains_the_link():
+    stored = [_listing('1', "Kettutie 5 A 3, Herttoniemi, Helsinki", "400 000 €", 'oikotie')]
+    merged = _by_id(merge_sources(
+        [(Oikotie(), []),
+         (Etuovi(), [_listing('etuovi_9', "Kettutie 5 A 3, Helsinki", "395 000 €", 'etuovi')])],
+        stored))
+    assert 'etuovi_9' not in merged
+    assert set(merged['1']['sources']) == {'oikotie', 'etuovi'}
+    assert not merged['1'].get('removed')
+
+
+def test_centroid_positions_are_not_matched_as_precise():
+    # Same district centre, different streets: not the same apartment even without a precision field
+    merged = merge_sources([
+        (Oikotie(), [_listing('1', "Kettutie 5, Herttoniemi, Helsinki", "400 000 €", 'oikotie',
+                              latitude=60.1950, longitude=25.0300)]),
+        (Etuovi(), [_listing('etuovi_9', "Siilitie 2, Helsinki", "400 000 €", 'etuovi',
+                             latitude=60.1950, longitude=25.0300)]),
+    ])
+    assert len(merged) == 2